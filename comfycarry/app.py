@@ -9,6 +9,7 @@ import os
 import subprocess
 import sys
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
 from flask import Flask
@@ -16,10 +17,10 @@ from flask_cors import CORS
 
 from . import config as cfg
 from .config import (
-    CONFIG_FILE, MANAGER_PORT,
+    MANAGER_PORT,
     _load_session_secret, _get_config,
 )
-from .utils import _get_api_key
+from .utils import _get_api_key, _pm2_jlist_invalidate, _pm2_start_comfyui, _save_api_key
 from .auth import auth_bp, register_auth_middleware, DebugSessionInterface
 
 # Route Blueprints
@@ -89,6 +90,25 @@ def create_app():
     return app
 
 
+def _pm2_dump_has(name):
+    """读 pm2 dump 快照判断进程是否已注册 (免去启动 node 跑 pm2 jlist).
+
+    快照只有在当前 daemon 启动之后写出 (mtime ≥ pm2.pid 的 mtime) 才反映 daemon 的进程表;
+    容器重启后 daemon 是新的, 之前 pm2 save 的快照再新也不可信.
+    daemon 未运行 / 快照早于 daemon / 不含该进程时返回 False, 由调用方回退到 pm2 jlist
+    """
+    pm2_home = os.environ.get("PM2_HOME") or os.path.expanduser("~/.pm2")
+    dump = os.path.join(pm2_home, "dump.pm2")
+    try:
+        if os.path.getmtime(dump) < os.path.getmtime(os.path.join(pm2_home, "pm2.pid")):
+            return False
+        with open(dump) as f:
+            procs = json.load(f)
+        return any(p.get("name") == name for p in procs)
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
 def _restore_comfyui(log):
     """容器重启后自动恢复 ComfyUI 进程.
 
@@ -109,17 +129,19 @@ def _restore_comfyui(log):
     if not os.path.isdir(comfy_dir):
         return
 
-    # 检查 comfy 进程是否已在运行
+    # 检查 comfy 进程是否已在运行 (已存在则 running 或 stopped 都不干预)
+    if _pm2_dump_has("comfy"):
+        return
     try:
         r = subprocess.run(
-            "pm2 jlist",
-            shell=True, capture_output=True, text=True, timeout=10,
+            ["pm2", "jlist"],
+            capture_output=True, text=True, timeout=10,
         )
         if r.returncode == 0:
             procs = json.loads(r.stdout)
             for p in procs:
                 if p.get("name") == "comfy":
-                    return  # 已存在 (running 或 stopped 都不干预)
+                    return
     except Exception:
         pass
 
@@ -130,19 +152,55 @@ def _restore_comfyui(log):
 
     py = _detect_python()
     try:
-        cmd = (
-            f'cd {comfy_dir} && pm2 start {py} --name comfy '
-            f'--interpreter none --log /workspace/comfy.log --time '
-            f'--restart-delay 3000 --max-restarts 10 '
-            f'-- main.py {saved_args}'
-        )
-        subprocess.run(cmd, shell=True, timeout=30)
-        subprocess.run("pm2 save 2>/dev/null || true", shell=True, timeout=5)
+        _pm2_start_comfyui(py, saved_args)
+        _pm2_jlist_invalidate()
+        subprocess.run(["pm2", "save"], stderr=subprocess.DEVNULL, timeout=5)
         log.info(f"ComfyUI 已自动恢复 (args: {saved_args})")
     except Exception as e:
         log.warning(f"ComfyUI 自动恢复失败: {e}")
 
 
+def _restore_public_tunnel():
+    """恢复公共 Tunnel (如果之前是公共模式, 恢复心跳线程), 返回启动提示.
+
+    注意: 首次注册由 bootstrap.sh 完成, Dashboard 只负责 restore
+    """
+    if cfg.get_config("tunnel_mode") != "public":
+        return None
+    try:
+        from .services.public_tunnel import PublicTunnelClient
+        client = PublicTunnelClient()
+        result = client.restore()
+        if result.get("ok"):
+            return f"  🌐 公共 Tunnel 已恢复: {result.get('random_id', '?')}"
+        return f"  ⚠️  公共 Tunnel 恢复失败: {result.get('error', '未知')}"
+    except Exception as e:
+        return f"  ⚠️  公共 Tunnel 恢复失败: {e}"
+
+
+def _start_watch_worker():
+    """有启用的 watch 规则时启动 sync worker, 返回启动提示"""
+    rules = _load_sync_rules()
+    watch_rules = [r for r in rules
+                   if r.get("trigger") == "watch" and r.get("enabled", True)]
+    if not watch_rules:
+        return None
+    start_sync_worker()
+    return f"  ☁️  Sync Worker 已启动 ({len(watch_rules)} 条监控规则)"
+
+
+def _start_companion_serve():
+    """启动 Companion WebDAV serve (rclone serve webdav, 经 Flask 反代 /api/companion/dav 暴露)"""
+    try:
+        from .services import companion_serve
+        from .config import COMPANION_DAV_PORT as _dav_port
+        if companion_serve.start():
+            return f"  📡  Companion WebDAV serve 已启动 (:{_dav_port}/dav, 反代 /api/companion/dav)"
+    except Exception as e:
+        return f"  ⚠️  Companion WebDAV serve 启动失败: {e}"
+    return None
+
+
 def main():
     """入口函数 — 启动 Flask 应用"""
     import atexit
@@ -165,56 +223,32 @@ def main():
     # 从环境变量导入 API Key
     civitai_token = os.environ.get("CIVITAI_TOKEN", "")
     if civitai_token and not _get_api_key():
-        CONFIG_FILE.write_text(json.dumps({"api_key": civitai_token}))
+        _save_api_key(civitai_token)
         print(f"  📝 已从环境变量 CIVITAI_TOKEN 导入 API Key")
 
     # 启动系统指标采集守护线程 (pynvml + psutil, 2s 间隔)
     system_monitor.start()
 
-    # 启动 ComfyUI WS Bridge
-    get_bridge()
-
-    # 恢复 SSH 配置
-    restore_ssh_config()
-
-    # 恢复 ComfyUI (如果 setup 已完成、ComfyUI 已安装、但进程未运行)
-    _restore_comfyui(app.logger)
-
     # 确保 ControlNet 预处理输出子目录存在
     for sub in ("openpose", "canny", "depth"):
         os.makedirs(os.path.join(cfg.COMFYUI_DIR, "input", sub), exist_ok=True)
 
-    # 恢复公共 Tunnel (如果之前是公共模式, 恢复心跳线程)
-    # 注意: 首次注册由 bootstrap.sh 完成, Dashboard 只负责 restore
-    tunnel_mode = cfg.get_config("tunnel_mode")
-    if tunnel_mode == "public":
-        try:
-            from .services.public_tunnel import PublicTunnelClient
-            client = PublicTunnelClient()
-            result = client.restore()
-            if result.get("ok"):
-                print(f"  🌐 公共 Tunnel 已恢复: {result.get('random_id', '?')}")
-            else:
-                print(f"  ⚠️  公共 Tunnel 恢复失败: {result.get('error', '未知')}")
-        except Exception as e:
-            print(f"  ⚠️  公共 Tunnel 恢复失败: {e}")
-
-    # 启动 watch worker
-    rules = _load_sync_rules()
-    watch_rules = [r for r in rules
-                   if r.get("trigger") == "watch" and r.get("enabled", True)]
-    if watch_rules:
-        start_sync_worker()
-        print(f"  ☁️  Sync Worker 已启动 ({len(watch_rules)} 条监控规则)")
-
-    # 启动 Companion WebDAV serve (rclone serve webdav, 经 Flask 反代 /api/companion/dav 暴露)
-    try:
-        from .services import companion_serve
-        from .config import COMPANION_DAV_PORT as _dav_port
-        if companion_serve.start():
-            print(f"  📡  Companion WebDAV serve 已启动 (:{_dav_port}/dav, 反代 /api/companion/dav)")
-    except Exception as e:
-        print(f"  ⚠️  Companion WebDAV serve 启动失败: {e}")
+    # 启动副作用互相独立且都是 I/O (pm2 子进程 / Tunnel HTTP / 文件读写),
+    # 并发执行: 启动耗时从各步之和降为最慢一步; 提示按固定顺序在汇合后输出
+    steps = [
+        get_bridge,                                # 启动 ComfyUI WS Bridge
+        restore_ssh_config,                        # 恢复 SSH 配置
+        lambda: _restore_comfyui(app.logger),      # 恢复 ComfyUI (setup 已完成但进程未运行)
+        _restore_public_tunnel,
+        _start_watch_worker,
+        _start_companion_serve,
+    ]
+    with ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix="startup") as ex:
+        futures = [ex.submit(step) for step in steps]
+        results = [f.result() for f in futures]
+    for msg in results:
+        if isinstance(msg, str):
+            print(msg)
 
     print(f"\n{'='*50}")
     print(f"  🖥️  ComfyCarry v2.4 (Modular)")
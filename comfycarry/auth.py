@@ -2,7 +2,11 @@
 ComfyCarry — 认证模块 (Login/Logout + check_auth 中间件)
 """
 
+import gzip
+import hashlib
+import hmac
 import logging
+import re
 
 from flask import Blueprint, request, Response, jsonify, redirect, session
 from flask.sessions import SecureCookieSessionInterface, SecureCookieSession
@@ -10,6 +14,11 @@ from itsdangerous import BadSignature
 
 from . import config
 
+try:
+    import brotli  # 可选依赖: 未安装时只提供 gzip
+except ImportError:
+    brotli = None
+
 auth_bp = Blueprint("auth", __name__)
 _auth_log = logging.getLogger("comfycarry.auth")
 
@@ -269,17 +278,107 @@ input::-ms-reveal,input::-ms-clear,input::-webkit-credentials-auto-fill-button{d
 </div>
 </body></html>"""
 
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_STYLE_BLOCK_RE = re.compile(r"(<style>)(.*?)(</style>)", re.S)
+
+
+def _minify_html(html: str) -> str:
+    """
+    轻量压缩内联页面: 删除 <style> 内的 CSS 注释, 去掉行首缩进与空行.
+
+    保留换行, 内联 JS 依赖的自动分号插入 (ASI) 不受影响.
+    """
+    html = _STYLE_BLOCK_RE.sub(
+        lambda m: m.group(1) + _CSS_COMMENT_RE.sub("", m.group(2)) + m.group(3), html,
+    )
+    return "\n".join(line.strip() for line in html.splitlines() if line.strip())
+
+
+def _split_login_assets(html: str) -> tuple[str, dict[str, tuple[bytes, str]]]:
+    """
+    把内联 <style>/<script> 抽成带内容 hash 的外部资源, 浏览器可长期缓存.
+
+    Returns:
+        (替换为 <link>/<script src> 后的 HTML, {文件名: (内容, mimetype)})
+    """
+    css = "\n".join(re.findall(r"<style>(.*?)</style>", html, re.S)).encode("utf-8")
+    js = "\n".join(re.findall(r"<script>(.*?)</script>", html, re.S)).encode("utf-8")
+    css_name = f"login.{hashlib.md5(css).hexdigest()[:10]}.css"
+    js_name = f"login.{hashlib.md5(js).hexdigest()[:10]}.js"
+
+    # 第一个 <style> 原位替换为 <link>, 其余删除 (多个样式块合并后顺序不变)
+    parts = re.split(r"<style>.*?</style>", html, flags=re.S)
+    html = parts[0] + f'<link rel="stylesheet" href="/login/assets/{css_name}">' + "".join(parts[1:])
+    # 主题脚本需在渲染前执行 (避免闪烁), 保持同步加载, 不加 defer
+    html = re.sub(
+        r"<script>.*?</script>", f'<script src="/login/assets/{js_name}"></script>', html,
+        count=1, flags=re.S,
+    )
+    return html, {
+        css_name: (css, "text/css"),
+        js_name: (js, "application/javascript"),
+    }
+
+
+# 模块加载时压缩 + 拆分一次, 之后每次请求直接使用处理后的页面
+LOGIN_PAGE, _LOGIN_ASSETS = _split_login_assets(_minify_html(LOGIN_PAGE))
+
+
+def _precompress(raw: bytes) -> dict[str, bytes]:
+    """静态页面一次性压缩: {encoding: body}, 请求时按 Accept-Encoding 直接选用"""
+    bodies = {"identity": raw, "gzip": gzip.compress(raw, 9)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(raw, quality=11)
+    return bodies
+
+
+# 两种页面变体 (无错误 / 密码错误) 预先编码 + 压缩, 请求时不再 replace + encode
+_LOGIN_OK_BODIES = _precompress(LOGIN_PAGE.replace("__ERR_KEY__", "").encode("utf-8"))
+_LOGIN_ERR_BODIES = _precompress(LOGIN_PAGE.replace("__ERR_KEY__", "invalid_password").encode("utf-8"))
+
+
+def _login_response(bodies: dict[str, bytes]) -> Response:
+    """按 Accept-Encoding 选预压缩版本 (br > gzip > 原文)"""
+    accept = request.accept_encodings
+    encoding = next((e for e in ("br", "gzip") if e in bodies and accept[e]), "identity")
+    resp = Response(bodies[encoding], mimetype="text/html")
+    if encoding != "identity":
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
+
+
+@auth_bp.route("/login/assets/<name>")
+def login_asset(name):
+    """登录页 CSS/JS (文件名含内容 hash, 可永久缓存)"""
+    asset = _LOGIN_ASSETS.get(name)
+    if not asset:
+        return "", 404
+    body, mimetype = asset
+    resp = Response(body, mimetype=mimetype)
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resp
+
+
+def check_dashboard_password(pw: str) -> bool:
+    """常量时间比较面板密码 (不按首个不同字节提前返回); 密码可在运行时修改, 每次读当前值"""
+    expected = str(config.DASHBOARD_PASSWORD or "")
+    return hmac.compare_digest(pw.encode("utf-8"), expected.encode("utf-8"))
+
 
 @auth_bp.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "GET":
-        return Response(LOGIN_PAGE.replace("__ERR_KEY__", ""), mimetype="text/html")
+        resp = _login_response(_LOGIN_OK_BODIES)
+        # 页面不含任何用户数据, 允许短时缓存
+        resp.headers["Cache-Control"] = "public, max-age=300"
+        return resp
     pw = request.form.get("password", "")
-    if pw == config.DASHBOARD_PASSWORD:
+    if check_dashboard_password(pw):
         session.permanent = True
         session["authed"] = True
         return redirect("/")
-    return Response(LOGIN_PAGE.replace("__ERR_KEY__", "invalid_password"), mimetype="text/html")
+    return _login_response(_LOGIN_ERR_BODIES)
 
 
 @auth_bp.route("/logout")
@@ -288,43 +387,45 @@ def logout():
     return redirect("/login")
 
 
+# 免鉴权路径 (模块级常量, 每请求直接做哈希/前缀查找)
+_PUBLIC_PATHS = frozenset({"/login", "/favicon.ico", "/api/version"})
+_STATIC_PREFIXES = ("/static/", "/assets/", "/login/assets/", "/fonts/")
+_STATIC_FILES = frozenset({"/apple-touch-icon.png", "/logo.png", "/logo-small.png"})
+
+# Setup 阶段额外放行的精确路由 (集中维护)
+_SETUP_OPEN_ROUTES = frozenset({
+    "/api/settings/import-config",  # 配置导入
+    "/api/tunnel/validate",         # Tunnel 验证 (Wizard Step 2)
+    "/api/llm/models",              # LLM 模型列表 (Wizard Step 6)
+})
+
+
 def register_auth_middleware(app):
     """注册全局认证中间件到 Flask app"""
 
-    # Setup 阶段额外放行的精确路由 (集中维护)
-    _SETUP_OPEN_ROUTES = {
-        "/api/settings/import-config",  # 配置导入
-        "/api/tunnel/validate",         # Tunnel 验证 (Wizard Step 2)
-        "/api/llm/models",              # LLM 模型列表 (Wizard Step 6)
-    }
-
     @app.before_request
     def check_auth():
         """全局鉴权与 Setup Wizard 路由"""
+        path = request.path
         # Setup 相关路由始终允许
-        if request.path.startswith("/api/setup/") or request.path == "/setup":
-            return
-        # Setup 阶段额外放行的路由
-        if not config._is_setup_complete() and request.path in _SETUP_OPEN_ROUTES:
+        if path.startswith("/api/setup/") or path == "/setup":
             return
-        if request.path in ("/login", "/favicon.ico", "/api/version"):
+        if path in _PUBLIC_PATHS:
             return
         # Companion 客户端连接: 仅凭面板密码换 API Key, 自身做密码校验,
         # 在鉴权前放行 (此时客户端无任何凭据)。仅放行该单一 POST 端点。
-        if request.method == "POST" and request.path == "/api/companion/connect":
+        if request.method == "POST" and path == "/api/companion/connect":
             return
-        if (
-            request.path.startswith("/static/")
-            or request.path.startswith("/assets/")
-            or request.path.startswith("/fonts/")
-            or request.path in ("/apple-touch-icon.png", "/logo.png", "/logo-small.png")
-        ):
+        if path.startswith(_STATIC_PREFIXES) or path in _STATIC_FILES:
             return
         # 如果尚未完成部署向导, 重定向到向导页
         if not config._is_setup_complete():
-            if request.path.startswith("/api/"):
+            # Setup 阶段额外放行的路由
+            if path in _SETUP_OPEN_ROUTES:
+                return
+            if path.startswith("/api/"):
                 return jsonify({"error": "Setup not complete", "setup_required": True}), 503
-            if request.path != "/":
+            if path != "/":
                 return redirect("/")
             return  # 让 index() 处理向导页渲染
         # 正常鉴权
@@ -338,13 +439,14 @@ def register_auth_middleware(app):
             auth_header = request.headers.get("Authorization", "")
             if auth_header.startswith("Bearer "):
                 api_key = auth_header[7:]
-        if api_key and api_key == config.API_KEY:
+        # 常量时间比较, 不按首个不同字节提前返回
+        if api_key and config.API_KEY and hmac.compare_digest(api_key.encode(), config.API_KEY.encode()):
             return
-        if request.path.startswith("/api/"):
+        if path.startswith("/api/"):
             cookie_name = app.config.get("SESSION_COOKIE_NAME", "")
             _auth_log.warning(
                 "401 %s | cookie_present=%s",
-                request.path,
+                path,
                 cookie_name in request.cookies,
             )
             return jsonify({"error": "Unauthorized"}), 401
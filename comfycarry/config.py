@@ -4,15 +4,43 @@ ComfyCarry — 共享配置、常量、配置文件读写工具
 所有模块共同依赖的基础层，不引入 Flask 依赖。
 """
 
+import copy
 import json
 import logging
 import os
 import secrets
+import tempfile
 import threading
 from pathlib import Path
 
+try:
+    import orjson  # 可选依赖: Rust 实现, 解析/序列化明显快于标准库
+except ImportError:
+    orjson = None
+
 log = logging.getLogger(__name__)
 
+
+# ── JSON 编解码 (orjson 可选, 未安装时回退标准库) ─────────────
+def _json_loads(data):
+    """解析 JSON (bytes/str); 安装了 orjson 时使用 orjson, 否则回退标准库 json"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(data, indent=False) -> bytes:
+    """序列化为 UTF-8 JSON bytes (非 ASCII 原样输出, 同 ensure_ascii=False)"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    if indent:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
 # ── 版本号 (唯一源) ──────────────────────────────────────────
 APP_VERSION = "v0.4.0"
 
@@ -34,11 +62,11 @@ MEILI_BEARER = "8c46eb2508e21db1e9828a97968d91ab1ca1caa5f70a00e88a2ba1e286603b61
 DASHBOARD_ENV_FILE = Path("/workspace/.dashboard_env")
 
 
-def _load_config():
-    """从 .dashboard_env 加载全部配置"""
+def _read_config():
+    """读取并解析 .dashboard_env (不存在 / 损坏时返回 {})"""
     if DASHBOARD_ENV_FILE.exists():
         try:
-            return json.loads(DASHBOARD_ENV_FILE.read_text(encoding="utf-8"))
+            return _json_loads(DASHBOARD_ENV_FILE.read_bytes())
         except json.JSONDecodeError as e:
             log.warning(f"[config] .dashboard_env JSON 损坏, 将使用默认值: {e}")
         except Exception as e:
@@ -46,28 +74,88 @@ def _load_config():
     return {}
 
 
+def _atomic_write_bytes(path: Path, payload: bytes):
+    """先完整写入临时文件再 os.replace, 读取方 / 进程中途退出都不会留下半截 JSON
+
+    临时文件名由 mkstemp 生成 (同目录, 保证 os.replace 原子), 并发写同一文件时互不覆盖对方的半成品
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
 def _save_config(data):
     """写入 .dashboard_env"""
-    DASHBOARD_ENV_FILE.write_text(
-        json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8"
-    )
+    _atomic_write_bytes(DASHBOARD_ENV_FILE, _json_dumps(data, indent=True))
 
 
 _config_lock = threading.Lock()
 
+# 解析结果缓存: (文件签名 (mtime_ns, size) | None, dict)
+# 整个元组一次赋值发布, 读路径只需一次 stat + 一次全局读取, 不加锁;
+# 缓存的 dict 发布后不再修改 (写入时替换为新 dict)
+_config_cache = (None, {})
 
-def _get_config(key, default=""):
-    """读取单个配置值 (线程安全)"""
+
+def _config_sig():
+    try:
+        st = DASHBOARD_ENV_FILE.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _reload_config_locked():
+    """文件签名变化 (含外部进程写入) 时重新解析; 调用方须持有 _config_lock"""
+    global _config_cache
+    sig = _config_sig()
+    if sig != _config_cache[0]:
+        _config_cache = (sig, _read_config() if sig else {})
+    return _config_cache[1]
+
+
+def _config_snapshot():
+    """当前配置 (共享引用, 只读)"""
+    cached_sig, data = _config_cache
+    if _config_sig() == cached_sig:
+        return data
     with _config_lock:
-        return _load_config().get(key, default)
+        return _reload_config_locked()
+
+
+def _load_config():
+    """从 .dashboard_env 加载全部配置 (返回可自由修改的副本)"""
+    return copy.deepcopy(_config_snapshot())
+
+
+def _get_config(key, default=""):
+    """读取单个配置值 (线程安全; 文件未变化时不重新读取解析)"""
+    value = _config_snapshot().get(key, default)
+    # 容器类型返回副本, 调用方修改不会污染缓存
+    return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
 
 
 def _set_config(key, value):
     """写入单个配置值 (线程安全)"""
+    global _config_cache
     with _config_lock:
-        data = _load_config()
-        data[key] = value
+        current = _reload_config_locked()
+        # 值未变化 (如重复写入 session_secret / installed_fa2) 时不重写整个文件
+        if key in current and type(current[key]) is type(value) and current[key] == value:
+            return
+        data = dict(current)
+        data[key] = copy.deepcopy(value)
         _save_config(data)
+        # 刚写入的内容即为最新状态, 直接发布, 不必回读
+        _config_cache = (_config_sig(), data)
 
 
 # 公开别名 (供 deploy_engine 等外部模块使用)
@@ -172,7 +260,9 @@ MODEL_DIRS = {
     "workflows": "user",
 }
 
-MODEL_EXTENSIONS = {".safetensors", ".ckpt", ".pt", ".pth", ".bin", ".gguf"}
+MODEL_EXTENSIONS = frozenset({".safetensors", ".ckpt", ".pt", ".pth", ".bin", ".gguf"})
+# str.endswith 接受 tuple, 一次调用完成全部后缀判断 (替代 any(... for e in MODEL_EXTENSIONS))
+MODEL_EXTENSION_SUFFIXES = tuple(sorted(MODEL_EXTENSIONS))
 
 
 # ── Extra Model Paths (extra_model_paths.yaml 解析) ──────────
@@ -253,7 +343,7 @@ def get_extra_model_paths() -> dict[str, list[str]]:
 # ── Setup Wizard ─────────────────────────────────────────────
 SETUP_STATE_FILE = Path("/workspace/.setup_state.json")
 
-DEFAULT_PLUGINS = [
+DEFAULT_PLUGINS = (
     {"url": "https://github.com/ltdrdata/ComfyUI-Manager", "name": "ComfyUI-Manager", "required": True},
     {"url": "comfycarry_ws_broadcast", "name": "ComfyCarry WS Broadcast", "required": True},
     {"url": "https://github.com/Fannovel16/comfyui_controlnet_aux", "name": "ControlNet Aux"},
@@ -276,10 +366,14 @@ DEFAULT_PLUGINS = [
     {"url": "https://github.com/Kosinkadink/ComfyUI-VideoHelperSuite", "name": "Video Helper Suite"},
     {"url": "https://github.com/cubiq/ComfyUI_essentials", "name": "Essentials"},
     {"url": "https://github.com/1038lab/ComfyUI-RMBG", "name": "RMBG"},
-]
+)
+DEFAULT_PLUGIN_URLS = frozenset(p["url"] for p in DEFAULT_PLUGINS)
 
 _setup_state_lock = threading.Lock()
 
+# 最近一次写入: (文件签名 (mtime_ns, size), 序列化内容); 文件未被外部改动且内容相同时跳过写入
+_setup_state_written = (None, b"")
+
 
 def _load_setup_state():
     """加载 Setup Wizard 状态"""
@@ -307,7 +401,7 @@ def _load_setup_state():
     with _setup_state_lock:
         if SETUP_STATE_FILE.exists():
             try:
-                state = json.loads(SETUP_STATE_FILE.read_text(encoding="utf-8"))
+                state = _json_loads(SETUP_STATE_FILE.read_bytes())
                 for k, v in defaults.items():
                     if k not in state:
                         state[k] = v
@@ -318,21 +412,41 @@ def _load_setup_state():
 
 
 def _save_setup_state(state):
-    """保存 Setup Wizard 状态"""
+    """保存 Setup Wizard 状态 (原子替换; 内容未变化时不写盘)"""
+    global _setup_state_written
+    payload = _json_dumps(state, indent=True)
     with _setup_state_lock:
-        SETUP_STATE_FILE.write_text(
-            json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8"
-        )
+        try:
+            st = SETUP_STATE_FILE.stat()
+            sig = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            sig = None
+        if sig is not None and (sig, payload) == _setup_state_written:
+            return
+        _atomic_write_bytes(SETUP_STATE_FILE, payload)
+        st = SETUP_STATE_FILE.stat()
+        _setup_state_written = ((st.st_mtime_ns, st.st_size), payload)
+
+
+# (状态文件 mtime_ns, size) → deploy_completed; 每个请求的鉴权都会调用, 避免重复读取/解析 JSON
+_setup_complete_cache = (None, False)
 
 
 def _is_setup_complete():
-    """检查部署是否已完成"""
-    if not SETUP_STATE_FILE.exists():
-        if Path("/workspace/ComfyUI/main.py").exists():
-            return True
-        return False
-    state = _load_setup_state()
-    return state.get("deploy_completed", False)
+    """检查部署是否已完成 (状态文件未变化时只需一次 stat)"""
+    global _setup_complete_cache
+    try:
+        st = SETUP_STATE_FILE.stat()
+    except FileNotFoundError:
+        return Path("/workspace/ComfyUI/main.py").exists()
+    sig = (st.st_mtime_ns, st.st_size)
+    cached_sig, cached = _setup_complete_cache
+    if sig == cached_sig:
+        return cached
+    # 部署重置 / 重新部署会把 deploy_completed 改回 False, 因此按文件签名失效而非永久缓存
+    done = bool(_load_setup_state().get("deploy_completed", False))
+    _setup_complete_cache = (sig, done)
+    return done
 
 
 # ── Sync 配置路径 ────────────────────────────────────────────
@@ -342,7 +456,7 @@ SYNC_SETTINGS_FILE = Path("/workspace/.sync_settings.json")
 
 
 # ── 同步规则模板 ─────────────────────────────────────────────
-SYNC_RULE_TEMPLATES = [
+SYNC_RULE_TEMPLATES = (
     {"id": "tpl-pull-workflows",  "name": "⬇️ 下载工作流",        "direction": "pull", "remote_path": "ComfyCarry/workflow",    "local_path": "user/default/workflows", "method": "copy",  "trigger": "deploy"},
     {"id": "tpl-pull-loras",      "name": "⬇️ 下载 LoRA",         "direction": "pull", "remote_path": "ComfyCarry/loras",       "local_path": "models/loras",           "method": "copy",  "trigger": "deploy"},
     {"id": "tpl-pull-checkpoints","name": "⬇️ 下载 Checkpoints",  "direction": "pull", "remote_path": "ComfyCarry/checkpoints", "local_path": "models/checkpoints",     "method": "copy",  "trigger": "deploy"},
@@ -355,7 +469,8 @@ SYNC_RULE_TEMPLATES = [
     {"id": "tpl-push-output",     "name": "⬆️ 上传输出 (移动)",    "direction": "push", "remote_path": "ComfyCarry/output",          "local_path": "output",                 "method": "move",  "trigger": "watch", "watch_interval": 15, "filters": ["+ *.{png,jpg,jpeg,webp,gif,bmp,tiff,tif,mp4,mov,webm,mkv,avi}", "- .*/**", "- *"]},
     {"id": "tpl-push-output-copy","name": "⬆️ 上传输出 (保留本地)","direction": "push", "remote_path": "ComfyCarry/output",          "local_path": "output",                 "method": "copy",  "trigger": "watch", "watch_interval": 15, "filters": ["+ *.{png,jpg,jpeg,webp,gif,bmp,tiff,tif,mp4,mov,webm,mkv,avi}", "- .*/**", "- *"]},
     {"id": "tpl-push-workflows",  "name": "⬆️ 备份工作流",        "direction": "push", "remote_path": "ComfyCarry/workflow",     "local_path": "user/default/workflows", "method": "copy",  "trigger": "manual"},
-]
+)
+SYNC_RULE_TEMPLATES_BY_ID = {t["id"]: t for t in SYNC_RULE_TEMPLATES}
 
 # ── Remote 类型表单定义 ──────────────────────────────────────
 REMOTE_TYPE_DEFS = {
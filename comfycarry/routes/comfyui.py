@@ -13,28 +13,36 @@ ComfyCarry — ComfyUI 管理路由
 - /api/comfyui/logs/stream — SSE 日志流
 """
 
-import json
+import heapq
+import os
 import queue
-import re
+import select
 import shlex
 import subprocess
+import time
+from operator import itemgetter
 
-import requests
 from flask import Blueprint, Response, jsonify, request
 
-from ..config import COMFYUI_URL, COMFYUI_DIR, _set_config
+from ..config import COMFYUI_URL, _get_config, _json_dumps, _json_loads, _set_config
 from ..services.comfyui_params import (
     COMFYUI_PARAM_GROUPS,
     parse_comfyui_args,
     build_comfyui_args,
 )
-from ..services.comfyui_bridge import get_bridge
+from ..services.comfyui_bridge import _comfyui_session, get_bridge
 from ..services.comfyui_version import get_versions, switch_version
 from ..services.deploy_engine import _detect_python
+from ..utils import _log_level, _pm2_jlist_invalidate, _pm2_proc, _pm2_start_comfyui
 
 bp = Blueprint("comfyui", __name__)
 
 
+def _fast_jsonify(data, status=200):
+    """直接用 _json_dumps (orjson 可选) 序列化, 绕过 Flask 的 JSON provider"""
+    return Response(_json_dumps(data), status=status, mimetype="application/json")
+
+
 # ====================================================================
 # ComfyUI 状态 & 参数
 # ====================================================================
@@ -44,17 +52,14 @@ def api_comfyui_status():
     result = {"online": False, "system": {},
               "params": {}, "args": []}
     try:
-        resp = requests.get(f"{COMFYUI_URL}/system_stats", timeout=5)
+        resp = _comfyui_session.get(f"{COMFYUI_URL}/system_stats", timeout=5)
         data = resp.json()
         result["online"] = True
         result["system"] = data.get("system", {})
     except Exception:
         pass
     try:
-        r = subprocess.run("pm2 jlist 2>/dev/null", shell=True,
-                           capture_output=True, text=True, timeout=5)
-        procs = json.loads(r.stdout or "[]")
-        comfy = next((p for p in procs if p.get("name") == "comfy"), None)
+        comfy = _pm2_proc("comfy")
         if comfy:
             pm2_env = comfy.get("pm2_env", {})
             raw_args = pm2_env.get("args", [])
@@ -67,52 +72,41 @@ def api_comfyui_status():
             result["pm2_uptime"] = pm2_env.get("pm_uptime", 0)
     except Exception:
         pass
-    return jsonify(result)
+    return _fast_jsonify(result)
+
+
+# 参数 schema 的静态部分 (模块加载时构建一次); 请求时只填 value 并过滤 attention 选项
+_SCHEMA_KEYS = ("options", "depends_on", "help", "flag", "flag_map", "flag_prefix")
+_PARAM_SCHEMA = {
+    gk: {
+        "label": gv["label"], "type": gv["type"], "value": None,
+        **{k: (list(gv[k]) if k == "options" else gv[k]) for k in _SCHEMA_KEYS if k in gv},
+    }
+    for gk, gv in COMFYUI_PARAM_GROUPS.items()
+}
 
 
 @bp.route("/api/comfyui/params", methods=["GET"])
 def api_comfyui_params_get():
     """获取参数定义 + 当前值"""
     try:
-        r = subprocess.run("pm2 jlist 2>/dev/null", shell=True,
-                           capture_output=True, text=True, timeout=5)
-        procs = json.loads(r.stdout or "[]")
-        comfy = next((p for p in procs if p.get("name") == "comfy"), None)
+        comfy = _pm2_proc("comfy")
         raw_args = []
         if comfy:
             raw_args = comfy.get("pm2_env", {}).get("args", [])
             if isinstance(raw_args, str):
                 raw_args = raw_args.split()
         current = parse_comfyui_args(raw_args)
-        schema = {}
-        for gk, gv in COMFYUI_PARAM_GROUPS.items():
-            schema[gk] = {
-                "label": gv["label"], "type": gv["type"],
-                "value": current.get(gk),
-            }
-            if "options" in gv:
-                opts = list(gv["options"])
-                # 根据安装状态过滤 Attention 选项
-                if gk == "attention":
-                    from ..config import _get_config
-                    has_fa2 = _get_config("installed_fa2", False)
-                    has_sa2 = _get_config("installed_sa2", False)
-                    if not has_fa2:
-                        opts = [o for o in opts if o[0] != "flash"]
-                    if not has_sa2:
-                        opts = [o for o in opts if o[0] != "sage"]
-                schema[gk]["options"] = opts
-            if "depends_on" in gv:
-                schema[gk]["depends_on"] = gv["depends_on"]
-            if "help" in gv:
-                schema[gk]["help"] = gv["help"]
-            if "flag" in gv:
-                schema[gk]["flag"] = gv["flag"]
-            if "flag_map" in gv:
-                schema[gk]["flag_map"] = gv["flag_map"]
-            if "flag_prefix" in gv:
-                schema[gk]["flag_prefix"] = gv["flag_prefix"]
-        return jsonify({"schema": schema, "current": current, "raw_args": raw_args})
+        schema = {gk: {**tpl, "value": current.get(gk)} for gk, tpl in _PARAM_SCHEMA.items()}
+        # 根据安装状态过滤 Attention 选项 (唯一随环境变化的选项列表)
+        if "attention" in schema and "options" in schema["attention"]:
+            opts = schema["attention"]["options"]
+            if not _get_config("installed_fa2", False):
+                opts = [o for o in opts if o[0] != "flash"]
+            if not _get_config("installed_sa2", False):
+                opts = [o for o in opts if o[0] != "sage"]
+            schema["attention"]["options"] = opts
+        return _fast_jsonify({"schema": schema, "current": current, "raw_args": raw_args})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -134,16 +128,10 @@ def api_comfyui_params_update():
     py = _detect_python()
 
     try:
-        subprocess.run("pm2 delete comfy 2>/dev/null || true",
-                       shell=True, timeout=10)
-        cmd = (
-            f'cd {COMFYUI_DIR} && pm2 start {py} --name comfy '
-            f'--interpreter none --log /workspace/comfy.log --time '
-            f'--restart-delay 3000 --max-restarts 10 '
-            f'-- main.py {args_str}'
-        )
-        subprocess.run(cmd, shell=True, timeout=30, check=True)
-        subprocess.run("pm2 save 2>/dev/null || true", shell=True, timeout=5)
+        subprocess.run(["pm2", "delete", "comfy"], stderr=subprocess.DEVNULL, timeout=10)
+        _pm2_start_comfyui(py, args_str, check=True)
+        subprocess.run(["pm2", "save"], stderr=subprocess.DEVNULL, timeout=5)
+        _pm2_jlist_invalidate()
 
         # 持久化到 .dashboard_env (容器重启后可恢复)
         _set_config("comfyui_args", args_str)
@@ -159,17 +147,20 @@ def api_comfyui_params_update():
 @bp.route("/api/comfyui/queue")
 def api_comfyui_queue():
     try:
-        resp = requests.get(f"{COMFYUI_URL}/queue", timeout=5)
-        return jsonify(resp.json())
+        resp = _comfyui_session.get(f"{COMFYUI_URL}/queue", timeout=5)
+        if resp.ok:
+            # 上游已是 JSON, 原样转发, 省去解析 + 重新序列化
+            return Response(resp.content, mimetype="application/json")
     except Exception:
-        return jsonify({"queue_running": [], "queue_pending": [],
-                        "error": "ComfyUI 无法连接"})
+        pass
+    return jsonify({"queue_running": [], "queue_pending": [],
+                    "error": "ComfyUI 无法连接"})
 
 
 @bp.route("/api/comfyui/interrupt", methods=["POST"])
 def api_comfyui_interrupt():
     try:
-        requests.post(f"{COMFYUI_URL}/interrupt", timeout=5)
+        _comfyui_session.post(f"{COMFYUI_URL}/interrupt", timeout=5)
         return jsonify({"ok": True})
     except Exception:
         return jsonify({"error": "ComfyUI 无法连接"}), 503
@@ -183,8 +174,8 @@ def api_comfyui_queue_delete():
     if not prompt_ids:
         return jsonify({"error": "缺少 delete 参数"}), 400
     try:
-        requests.post(f"{COMFYUI_URL}/queue",
-                      json={"delete": prompt_ids}, timeout=5)
+        _comfyui_session.post(f"{COMFYUI_URL}/queue",
+                              json={"delete": prompt_ids}, timeout=5)
         return jsonify({"ok": True})
     except Exception:
         return jsonify({"error": "ComfyUI 无法连接"}), 503
@@ -194,8 +185,8 @@ def api_comfyui_queue_delete():
 def api_comfyui_queue_clear():
     """清空所有待排队的 prompt"""
     try:
-        requests.post(f"{COMFYUI_URL}/queue",
-                      json={"clear": True}, timeout=5)
+        _comfyui_session.post(f"{COMFYUI_URL}/queue",
+                              json={"clear": True}, timeout=5)
         return jsonify({"ok": True})
     except Exception:
         return jsonify({"error": "ComfyUI 无法连接"}), 503
@@ -204,6 +195,54 @@ def api_comfyui_queue_clear():
 # ====================================================================
 # 历史 & 图片
 # ====================================================================
+# 候选元组 (timestamp, prompt_id, entry) 的排序键; 模块级复用, 不每次请求新建
+_by_timestamp = itemgetter(0)
+
+
+def _is_output_image(img):
+    """output 类型且不是 CN 预处理输出 (subfolder 以 "input" 开头)"""
+    return img.get("type", "output") == "output" and not img.get("subfolder", "").startswith("input")
+
+
+def _has_output_image(entry):
+    for node_out in entry.get("outputs", {}).values():
+        if any(_is_output_image(img) for img in node_out.get("images", [])):
+            return True
+    return False
+
+
+def _history_timestamp(entry):
+    """从 status.messages 中提取 execution_start 时间戳 (无则 0)"""
+    for msg in entry.get("status", {}).get("messages", []):
+        if isinstance(msg, list) and len(msg) >= 2:
+            if msg[0] == "execution_start" and isinstance(msg[1], dict):
+                return msg[1].get("timestamp", 0)
+    return 0
+
+
+def _history_item(pid, entry, timestamp):
+    status = entry.get("status", {})
+    # 单遍分拣: 优先 output 类型, 仅在无 output 时回退到 temp
+    output_imgs, temp_imgs = [], []
+    for node_out in entry.get("outputs", {}).values():
+        for img in node_out.get("images", ()):
+            rec = {
+                "filename": img.get("filename", ""),
+                "subfolder": img.get("subfolder", ""),
+                "type": img.get("type", "output"),
+            }
+            if _is_output_image(rec):
+                output_imgs.append(rec)
+            elif rec["type"] == "temp":
+                temp_imgs.append(rec)
+    return {
+        "prompt_id": pid,
+        "completed": status.get("completed", False),
+        "images": output_imgs or temp_imgs,
+        "timestamp": timestamp,
+    }
+
+
 @bp.route("/api/comfyui/history")
 def api_comfyui_history():
     max_items = request.args.get("max_items", 5, type=int)
@@ -211,53 +250,28 @@ def api_comfyui_history():
     try:
         if filter_prompt_id:
             # 直接获取特定 prompt 的历史 (ComfyUI 支持 /history/{prompt_id})
-            resp = requests.get(f"{COMFYUI_URL}/history/{filter_prompt_id}", timeout=10)
-            raw = resp.json()
+            resp = _comfyui_session.get(f"{COMFYUI_URL}/history/{filter_prompt_id}", timeout=10)
         else:
-            resp = requests.get(f"{COMFYUI_URL}/history",
-                                params={"max_items": max_items}, timeout=10)
-            raw = resp.json()
-        items = []
-        for pid, entry in raw.items():
-            status = entry.get("status", {})
-            outputs = entry.get("outputs", {})
-            images = []
-            for node_id, node_out in outputs.items():
-                for img in node_out.get("images", []):
-                    images.append({
-                        "filename": img.get("filename", ""),
-                        "subfolder": img.get("subfolder", ""),
-                        "type": img.get("type", "output"),
-                    })
-            # 优先 output 类型, 仅在无 output 时回退到 temp
-            # 排除 subfolder 以 "input" 开头的图片 (CN 预处理输出)
-            output_imgs = [i for i in images
-                           if i["type"] == "output"
-                           and not i["subfolder"].startswith("input")]
-            temp_imgs = [i for i in images if i["type"] == "temp"]
-            images = output_imgs if output_imgs else temp_imgs
-            # 无有效 output 图片的条目跳过 (如纯预处理工作流)
-            if not output_imgs and not filter_prompt_id:
-                continue
-            # 从 status.messages 中提取时间戳
-            timestamp = 0
-            for msg in status.get("messages", []):
-                if isinstance(msg, list) and len(msg) >= 2:
-                    if msg[0] == "execution_start" and isinstance(msg[1], dict):
-                        timestamp = msg[1].get("timestamp", 0)
-                        break
-            items.append({
-                "prompt_id": pid,
-                "completed": status.get("completed", False),
-                "images": images,
-                "timestamp": timestamp,
-            })
-        items.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
-        return jsonify({"history": items[:max_items]})
+            resp = _comfyui_session.get(f"{COMFYUI_URL}/history",
+                                        params={"max_items": max_items}, timeout=10)
+        raw = _json_loads(resp.content)
+        # 第一遍只算排序键和有效性, 取 top-N; 第二遍只为入选条目构建图片列表 (时间戳复用, 不再重算)
+        candidates = (
+            (_history_timestamp(entry), pid, entry) for pid, entry in raw.items()
+            if filter_prompt_id or _has_output_image(entry)
+        )
+        top = heapq.nlargest(max_items, candidates, key=_by_timestamp)
+        items = [_history_item(pid, entry, ts) for ts, pid, entry in top]
+        return _fast_jsonify({"history": items})
     except Exception:
         return jsonify({"history": [], "error": "ComfyUI 无法连接"})
 
 
+# /view 代理透传的条件请求头 / 响应头 (浏览器据 ETag / Last-Modified 做 304 缓存校验)
+_VIEW_CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+_VIEW_FORWARD_HEADERS = ("Content-Length", "ETag", "Last-Modified")
+
+
 @bp.route("/api/comfyui/view")
 def api_comfyui_view():
     filename = request.args.get("filename", "")
@@ -272,18 +286,30 @@ def api_comfyui_view():
             params["subfolder"] = subfolder
         if preview:
             params["preview"] = preview
-        resp = requests.get(f"{COMFYUI_URL}/view", params=params,
-                            timeout=10, stream=True)
-        return resp.content, resp.status_code, {
-            "Content-Type": resp.headers.get("Content-Type", "image/png")
-        }
+        # 条件请求头透传给 ComfyUI, 图片未变化时由上游直接回 304, 不再重传
+        cond = {h: request.headers[h] for h in _VIEW_CONDITIONAL_HEADERS if h in request.headers}
+        resp = _comfyui_session.get(f"{COMFYUI_URL}/view", params=params,
+                                    headers=cond, timeout=10, stream=True)
     except Exception:
         return "", 503
+    # 分块转发, 不在内存里攒完整图片/视频; 首块到达即开始回传
+    headers = {"Content-Type": resp.headers.get("Content-Type", "image/png")}
+    for h in _VIEW_FORWARD_HEADERS:
+        if h in resp.headers:
+            headers[h] = resp.headers[h]
+    out = Response(resp.iter_content(65536), status=resp.status_code, headers=headers)
+    # 客户端断开或传输结束都会关闭上游响应, 连接归还连接池
+    out.call_on_close(resp.close)
+    return out
 
 
 # ====================================================================
 # SSE 实时事件流 (ComfyUI WS → SSE 桥接)
 # ====================================================================
+# 单次 yield 最多合并的 SSE 事件数
+_SSE_BATCH_MAX = 32
+
+
 @bp.route("/api/comfyui/events")
 def api_comfyui_events():
     bridge = get_bridge()
@@ -293,10 +319,25 @@ def api_comfyui_events():
         try:
             while True:
                 try:
-                    event = q.get(timeout=30)
-                    yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                    batch = [q.get(timeout=30)]
+                except queue.Empty:
+                    yield b": keepalive\n\n"
+                    continue
+                # 首个事件到达立即发送; 同时把已排队的事件 (采样进度突发) 一并带走,
+                # 多帧拼成一次 yield / 一次 socket 写
+                try:
+                    while len(batch) < _SSE_BATCH_MAX:
+                        batch.append(q.get_nowait())
                 except queue.Empty:
-                    yield ": keepalive\n\n"
+                    pass
+                # None: Bridge 因消费过慢移除了本订阅, 结束响应让浏览器重连拿完整快照
+                closed = batch[-1] is None
+                if closed:
+                    batch.pop()
+                if batch:
+                    yield b"".join(b"data: " + _json_dumps(e) + b"\n\n" for e in batch)
+                if closed:
+                    return
         except GeneratorExit:
             pass
         finally:
@@ -307,6 +348,33 @@ def api_comfyui_events():
                              "X-Accel-Buffering": "no"})
 
 
+# pm2 日志管道单次读取大小 / 无换行时的单行上限
+_LOG_READ_SIZE = 65536
+_LOG_LINE_MAX = 1 << 20
+# 日志合批: 等待后续输出的时长 / 单个 SSE 事件最多携带的行数
+_LOG_COALESCE_SECS = 0.05
+_LOG_BATCH_MAX = 32
+
+
+def _log_frames(text):
+    """多行日志文本 → 拼接好的 SSE 帧; 无有效行时返回空 bytes.
+
+    单行仍发 {"line", "level"}; 多行每 _LOG_BATCH_MAX 行合成一个 {"batch": [...]} 事件,
+    摊薄逐行 JSON 序列化 / SSE 分帧以及浏览器端 onmessage 回调的开销
+    """
+    entries = [
+        {"line": line, "level": _log_level(line)}
+        for line in (raw.rstrip("\r") for raw in text.split("\n"))
+        if line
+    ]
+    if len(entries) == 1:
+        return b"data: " + _json_dumps(entries[0]) + b"\n\n"
+    return b"".join(
+        b"data: " + _json_dumps({"batch": entries[i:i + _LOG_BATCH_MAX]}) + b"\n\n"
+        for i in range(0, len(entries), _LOG_BATCH_MAX)
+    )
+
+
 @bp.route("/api/comfyui/logs/stream")
 def api_comfyui_logs_stream():
     """SSE — pm2 log lines for comfy in real-time."""
@@ -316,20 +384,43 @@ def api_comfyui_logs_stream():
             proc = subprocess.Popen(
                 ["pm2", "logs", "comfy", "--raw", "--lines", "50"],
                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                text=True, bufsize=1
+                bufsize=0
             )
-            for line in iter(proc.stdout.readline, ''):
-                if not line:
+            # 按块 os.read (一次系统调用取走管道中已有的全部输出), 自行按行切分;
+            # 末尾不完整的行 (可能截断多字节字符) 留到下一块
+            fd = proc.stdout.fileno()
+            pending = b""
+            eof = False
+            while not eof:
+                chunk = os.read(fd, _LOG_READ_SIZE)
+                if not chunk:
                     break
-                line = line.rstrip('\n')
-                if not line:
-                    continue
-                lvl = "info"
-                if re.search(r'error|exception|traceback', line, re.I):
-                    lvl = "error"
-                elif re.search(r'warn', line, re.I):
-                    lvl = "warn"
-                yield f"data: {json.dumps({'line': line, 'level': lvl}, ensure_ascii=False)}\n\n"
+                pending += chunk
+                # 突发输出: 50 ms 内陆续到达的日志合并进同一批再发送
+                deadline = time.monotonic() + _LOG_COALESCE_SECS
+                while len(pending) < _LOG_READ_SIZE:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                        break
+                    more = os.read(fd, _LOG_READ_SIZE)
+                    if not more:
+                        eof = True
+                        break
+                    pending += more
+                cut = pending.rfind(b"\n")
+                if cut < 0:
+                    if len(pending) < _LOG_LINE_MAX:
+                        continue
+                    cut = len(pending)  # 超长无换行输出, 整块作为一行发出
+                text = pending[:cut].decode("utf-8", "replace")
+                pending = pending[cut + 1:]
+                frames = _log_frames(text)
+                if frames:
+                    yield frames
+            if pending:
+                frames = _log_frames(pending.decode("utf-8", "replace"))
+                if frames:
+                    yield frames
         except GeneratorExit:
             pass
         finally:
@@ -374,6 +465,7 @@ def api_comfyui_switch():
     # 重启 ComfyUI PM2 进程
     try:
         subprocess.run(["pm2", "restart", "comfy"], capture_output=True, timeout=15)
+        _pm2_jlist_invalidate()
     except Exception:
         result["warning"] = "版本已切换，但 PM2 重启失败，请手动重启"
 
@@ -20,6 +20,7 @@ import uuid
 
 from flask import Blueprint, jsonify, request
 
+from ..auth import check_dashboard_password
 from ..config import (
     API_KEY,
     COMFYUI_DIR,
@@ -95,7 +96,7 @@ def api_companion_connect():
     if not DASHBOARD_PASSWORD:
         return jsonify({"error": "面板未设置密码, 无法连接"}), 503
 
-    if password != DASHBOARD_PASSWORD:
+    if not check_dashboard_password(password):
         log.warning("companion connect 密码不符")
         return jsonify({"error": "密码错误"}), 401
 
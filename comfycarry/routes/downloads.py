@@ -12,21 +12,22 @@ ComfyCarry — Downloads 路由
   POST /api/downloads/<id>/pause  — 暂停下载 (断点续传)
   POST /api/downloads/<id>/resume — 恢复暂停的下载
   GET  /api/downloads/<id>/events — SSE 实时进度流 (per-task)
+  POST /api/downloads/civitai/batch — 批量提交 CivitAI 下载
   POST /api/downloads/clear     — 清除已完成的历史
   GET  /api/downloads/snapshot  — 资源+任务快照
   GET  /api/downloads/stream    — 全局 SSE 事件流
 """
 
-import json
 import logging
 import os
 import queue
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from flask import Blueprint, Response, jsonify, request
 
-from ..config import COMFYUI_DIR, MODEL_DIRS
+from ..config import COMFYUI_DIR, MODEL_DIRS, _json_dumps
 from ..services.download_engine import get_engine, DownloadStatus
 from ..services.resource_registry import get_registry
 
@@ -344,7 +345,7 @@ def api_downloads_events(download_id: str):
 
     def _sse_generator():
         last_progress = -1
-        heartbeat_counter = 0
+        last_sent = time.monotonic()
         terminal_states = (
             DownloadStatus.COMPLETE,
             DownloadStatus.FAILED,
@@ -354,7 +355,7 @@ def api_downloads_events(download_id: str):
         while True:
             t = engine.get_task(download_id)
             if not t:
-                yield f"data: {json.dumps({'error': '任务已删除'})}\n\n"
+                yield b"data: " + _json_dumps({'error': '任务已删除'}) + b"\n\n"
                 break
 
             # 进度变化或终态 → 推送数据
@@ -369,15 +370,15 @@ def api_downloads_events(download_id: str):
                 }
                 if t.error:
                     event["error"] = t.error
-                yield f"data: {json.dumps(event)}\n\n"
+                yield b"data: " + _json_dumps(event) + b"\n\n"
                 last_progress = t.progress
-                heartbeat_counter = 0
+                last_sent = time.monotonic()
             else:
                 # 进度无变化时定期发心跳, 防止连接被中间件/浏览器超时断开
-                heartbeat_counter += 1
-                if heartbeat_counter >= 15:  # 约每 12 秒
+                now = time.monotonic()
+                if now - last_sent >= _SSE_HEARTBEAT_INTERVAL:
                     yield ": heartbeat\n\n"
-                    heartbeat_counter = 0
+                    last_sent = now
 
             if t.status in terminal_states:
                 break
@@ -500,16 +501,84 @@ def api_downloads_civitai():
     响应:
       {"download_id": "dl-xxx", "status": "active", "message": "...", ...}
     """
+    body, status = _submit_civitai(request.get_json(force=True) or {})
+    return jsonify(body), status
+
+
+# 单次批量提交的最大条目数
+_CIVITAI_BATCH_MAX = 50
+# 并发解析的线程数: 每个条目要回源 CivitAI (含重试), 串行时一批可能超过 Tunnel 的 ~100s 超时
+_CIVITAI_BATCH_WORKERS = 8
+
+
+def _batch_key(item: dict) -> tuple[str, str]:
+    return str(item.get("model_id", "")).strip(), str(item.get("version_id") or "")
+
+
+def _submit_civitai_safe(item: dict) -> dict:
+    """线程池任务: 提交单个条目, 异常转为错误响应体 (附 http_status)"""
+    try:
+        body, status = _submit_civitai(item)
+    except Exception as e:
+        logger.warning(f"CivitAI 批量提交失败: {e}")
+        body, status = {"error": str(e)}, 500
+    return {**body, "http_status": status}
+
+
+@bp.route("/api/downloads/civitai/batch", methods=["POST"])
+def api_downloads_civitai_batch():
+    """
+    批量提交 CivitAI 模型下载任务 — 一次请求提交多个模型, 省去逐个 POST 的往返.
+    各条目在有界线程池中并发解析 + 提交, 整批耗时约等于最慢的几个条目.
+
+    请求体:
+      {"items": [{...同 /api/downloads/civitai 的请求体...}, ...]}
+
+    响应:
+      {"results": [{...单个提交的响应体..., "http_status": 201}, ...]}  # 顺序与 items 一致
+    """
+    data = request.get_json(force=True) or {}
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items 必填"}), 400
+    if len(items) > _CIVITAI_BATCH_MAX:
+        return jsonify({"error": f"单次最多提交 {_CIVITAI_BATCH_MAX} 个模型"}), 400
+
+    # 同一 (model_id, version_id) 只提交一次, 重复条目直接复用首次结果
+    unique: dict[tuple[str, str], dict] = {}
+    for item in items:
+        if isinstance(item, dict):
+            unique.setdefault(_batch_key(item), item)
+
+    seen: dict[tuple[str, str], dict] = {}
+    if unique:
+        with ThreadPoolExecutor(max_workers=min(_CIVITAI_BATCH_WORKERS, len(unique))) as pool:
+            seen = dict(zip(unique, pool.map(_submit_civitai_safe, unique.values())))
+
+    results = []
+    for item in items:
+        if not isinstance(item, dict):
+            results.append({"error": "无效的条目", "http_status": 400})
+            continue
+        results.append(seen[_batch_key(item)])
+
+    duplicates = len(items) - len(seen) - sum(1 for i in items if not isinstance(i, dict))
+    if duplicates:
+        logger.info(f"CivitAI 批量提交: 跳过 {duplicates} 个重复条目")
+    return jsonify({"results": results})
+
+
+def _submit_civitai(data: dict) -> tuple[dict, int]:
+    """解析 + 提交单个 CivitAI 下载, 返回 (响应体, HTTP 状态码)"""
     from ..services.civitai_resolver import (
         resolve_civitai_download, save_model_metadata, download_preview_image,
         enrich_model_by_hash,
     )
     from ..utils import _get_api_key
 
-    data = request.get_json(force=True) or {}
     model_input = str(data.get("model_id", "")).strip()
     if not model_input:
-        return jsonify({"error": "model_id 必填"}), 400
+        return {"error": "model_id 必填"}, 400
 
     api_key = data.get("api_key") or _get_api_key()
     model_type = data.get("model_type", "")
@@ -530,9 +599,9 @@ def api_downloads_civitai():
             custom_filename=custom_filename,
         )
     except ValueError as e:
-        return jsonify({"error": str(e)}), 400
+        return {"error": str(e)}, 400
     except RuntimeError as e:
-        return jsonify({"error": str(e)}), 502
+        return {"error": str(e)}, 502
 
     # Early Access 付费模型检测
     info = resolved["info"]
@@ -540,10 +609,10 @@ def api_downloads_civitai():
         ea = info.get("early_access_config") or {}
         if ea.get("chargeForDownload"):
             price = ea.get("downloadPrice", "?")
-            return jsonify({
+            return {
                 "error": f"该模型为 Early Access 付费模型，需要 {price} Buzz 才能下载。请在 CivitAI 网站购买后再试。",
                 "early_access": True,
-            }), 403
+            }, 403
         # EarlyAccess 但不收费: 可能仅需登录, 继续尝试下载
 
     def _on_civitai_complete(task):
@@ -623,28 +692,29 @@ def api_downloads_civitai():
 
     # 提交失败 (aria2 RPC error) — 返回 200 + error 字段 (兼容 useApiFetch)
     if task.status == DownloadStatus.FAILED:
-        return jsonify({
+        return {
             **task.to_dict(),
             "error": task.error or "下载提交失败",
             "message": f"提交失败: {resolved['display_name']}",
             "resource_state": registry.get_state("civitai", res_model_id, res_version_id),
-        }), 200
+        }, 200
 
     if existed:
         msg = f"该模型已存在: {resolved['display_name']}"
     else:
         msg = f"已提交: {resolved['display_name']}"
 
-    return jsonify({
+    return {
         **task.to_dict(),
         "message": msg,
         "existed": existed,
         "resource_state": registry.get_state("civitai", res_model_id, res_version_id),
-    }), 201 if task.status == DownloadStatus.ACTIVE else 200
+    }, 201 if task.status == DownloadStatus.ACTIVE else 200
 
 
-# SSE 轮询间隔 (秒)
+# SSE 轮询间隔 / 心跳间隔 (秒)
 _SSE_POLL_INTERVAL = 0.8
+_SSE_HEARTBEAT_INTERVAL = 12.0
 
 
 # ── Snapshot + Global SSE ────────────────────────────────────────────────────
@@ -690,18 +760,18 @@ def api_downloads_stream():
     registry.add_listener(_listener)
 
     def _sse_generator():
-        heartbeat_counter = 0
+        last_sent = time.monotonic()
         try:
             while True:
                 try:
                     event = event_queue.get(timeout=1.0)
-                    yield f"data: {json.dumps(event)}\n\n"
-                    heartbeat_counter = 0
+                    yield b"data: " + _json_dumps(event) + b"\n\n"
+                    last_sent = time.monotonic()
                 except queue.Empty:
-                    heartbeat_counter += 1
-                    if heartbeat_counter >= 12:  # ~12s
+                    now = time.monotonic()
+                    if now - last_sent >= _SSE_HEARTBEAT_INTERVAL:
                         yield ": heartbeat\n\n"
-                        heartbeat_counter = 0
+                        last_sent = now
         finally:
             registry.remove_listener(_listener)
 
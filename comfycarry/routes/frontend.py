@@ -6,46 +6,172 @@ ComfyCarry — 前端页面服务路由
 - /assets/<path> — Vite 构建产物资源
 """
 
+import gzip
+import hashlib
 import os
+import stat
+import threading
+from collections import OrderedDict
 
-from flask import Blueprint, Response, send_file
+from flask import Blueprint, Response, request, send_file
 from pathlib import Path
 
 from ..config import SCRIPT_DIR, _is_setup_complete
 
+try:
+    import brotli  # 可选依赖: 未安装时只提供 gzip
+except ImportError:
+    brotli = None
+
 bp = Blueprint("frontend", __name__)
 
 DIST_DIR = Path(SCRIPT_DIR) / "static" / "dist"
+# 静态目录在导入时解析一次; 请求时只做字符串拼接 + 前缀检查, 不再逐级 resolve()
+_DIST_ROOT = str(DIST_DIR.resolve())
+_FONTS_DIR = os.path.join(_DIST_ROOT, "fonts")
+_ASSETS_DIR = os.path.join(_DIST_ROOT, "assets")
+
+# 预压缩缓存 (HTML 入口 + JS/CSS 资源): path → (mtime_ns, {encoding: body}, etag)
+# 每个文件只压缩一次, 之后每次请求只需一次 stat; mtime 变化 / 文件消失时丢弃旧条目.
+# 资源名带内容 hash, 每次 dist 重建都会产生新 key, 按 LRU 限制条目数, 旧构建的条目自然淘汰
+_compressed_cache: OrderedDict[str, tuple[int, dict[str, bytes], str]] = OrderedDict()
+_compressed_cache_lock = threading.Lock()
+# 每个 key 一把压缩锁: 冷缓存下并发请求同一 bundle 只压缩一次, 其余等待结果
+_compress_locks: dict[str, threading.Lock] = {}
+_COMPRESSED_CACHE_MAX = 64
+
+# 小于此大小不压缩 (压缩头开销抵消收益)
+_COMPRESS_MIN_SIZE = 1024
+# 可预压缩的文本资源; 字体 (woff2) / 图片本身已压缩, 仍走 send_file
+_COMPRESSIBLE_ASSETS = {
+    ".js": "application/javascript",
+    ".css": "text/css",
+    ".svg": "image/svg+xml",
+}
+# JS bundle 可达数 MB, brotli 11 级首个请求等待过久; 9 级体积相差很小
+_ASSET_BR_QUALITY = 9
+# 静态资源 (带 hash 的构建产物 / 字体 / public 图片) 的缓存策略
+_IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+def _cached_compressed(key: str, mtime: int):
+    """命中且 mtime 一致时返回缓存条目并标记为最近使用 (调用方需持有 _compressed_cache_lock)"""
+    cached = _compressed_cache.get(key)
+    if cached and cached[0] == mtime:
+        _compressed_cache.move_to_end(key)
+        return cached
+    return None
+
+
+def _load_compressed(path: Path, br_quality: int = 11) -> tuple[dict[str, bytes], str, int]:
+    """读取文件并预计算 gzip/br 版本 + ETag, 返回 (bodies, etag, mtime_ns) (文件不存在时抛 OSError)"""
+    key = str(path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        with _compressed_cache_lock:
+            _compressed_cache.pop(key, None)
+            _compress_locks.pop(key, None)
+        raise
+    with _compressed_cache_lock:
+        cached = _cached_compressed(key, mtime)
+        if cached:
+            return cached[1], cached[2], mtime
+        key_lock = _compress_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        # 等锁期间可能已由其他请求压缩完成
+        with _compressed_cache_lock:
+            cached = _cached_compressed(key, mtime)
+            if cached:
+                return cached[1], cached[2], mtime
+
+        raw = path.read_bytes()
+        bodies = {"identity": raw}
+        if len(raw) >= _COMPRESS_MIN_SIZE:
+            bodies["gzip"] = gzip.compress(raw, 9)
+            if brotli is not None:
+                bodies["br"] = brotli.compress(raw, quality=br_quality)
+        etag = hashlib.md5(raw).hexdigest()
+
+        with _compressed_cache_lock:
+            _compressed_cache[key] = (mtime, bodies, etag)
+            _compressed_cache.move_to_end(key)
+            while len(_compressed_cache) > _COMPRESSED_CACHE_MAX:
+                evicted, _ = _compressed_cache.popitem(last=False)
+                _compress_locks.pop(evicted, None)
+    return bodies, etag, mtime
+
+
+def _pick_encoding(bodies: dict[str, bytes]) -> str:
+    accept = request.accept_encodings
+    return next((e for e in ("br", "gzip") if e in bodies and accept[e]), "identity")
+
+
+def _serve_html(path: Path):
+    """按 Accept-Encoding 返回预压缩 HTML, 支持 If-None-Match → 304; 文件不存在返回 None"""
+    try:
+        bodies, etag, mtime = _load_compressed(path)
+    except OSError:
+        return None
+
+    encoding = _pick_encoding(bodies)
+    resp = Response(bodies[encoding], mimetype="text/html")
+    if encoding != "identity":
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Vary"] = "Accept-Encoding"
+    # 不同编码是不同表示, ETag 需区分
+    resp.set_etag(etag if encoding == "identity" else f"{etag}-{encoding}")
+    # 同时给出 Last-Modified, 只发 If-Modified-Since 的客户端 / 代理也能得到 304
+    resp.last_modified = mtime / 1e9
+    # 允许缓存但每次必须回源校验 (入口 HTML 引用带 hash 的资源, 不能用过期副本)
+    resp.headers["Cache-Control"] = "no-cache, must-revalidate"
+    return resp.make_conditional(request)
+
+
+def _safe_join(base: str, filename: str) -> str | None:
+    """拼接 base 下的路径, 越界 (../ 或绝对路径) 时返回 None"""
+    path = os.path.normpath(os.path.join(base, filename))
+    return path if path.startswith(base + os.sep) else None
+
+
+def _is_regular_file(path: str) -> bool:
+    """一次 stat 同时判断存在 + 普通文件"""
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def _send_static(path: str, mimetype: str | None = None):
+    """二进制静态文件统一走 send_file (文件句柄经 wsgi.file_wrapper 交给服务器, 支持时可零拷贝 sendfile)
+
+    conditional 默认开启: ETag / Last-Modified / Range 均由 send_file 处理
+    """
+    resp = send_file(path, mimetype=mimetype)
+    resp.headers["Cache-Control"] = _IMMUTABLE_CACHE
+    return resp
 
 
 def _serve_public_file(filename: str, mimetype: str | None = None):
     """Serve Vite public files from dist root only."""
-    dist_file = (DIST_DIR / filename).resolve()
-
-    if dist_file.exists() and dist_file.is_file():
-        resp = send_file(str(dist_file), mimetype=mimetype)
-        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
-        return resp
+    path = _safe_join(_DIST_ROOT, filename)
+    if path and _is_regular_file(path):
+        return _send_static(path, mimetype)
     return "", 404
 
 
 @bp.route("/")
 def index():
     if not _is_setup_complete():
-        wizard_dist = DIST_DIR / "wizard.html"
-        if wizard_dist.exists():
-            resp = Response(wizard_dist.read_text(encoding="utf-8"),
-                            mimetype="text/html")
-            resp.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+        resp = _serve_html(DIST_DIR / "wizard.html")
+        if resp is not None:
             return resp
         return Response("<h1>dist/wizard.html not found</h1>",
                         mimetype="text/html", status=404)
 
-    dist_index = DIST_DIR / "index.html"
-    if dist_index.exists():
-        resp = Response(dist_index.read_text(encoding="utf-8"),
-                        mimetype="text/html")
-        resp.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+    resp = _serve_html(DIST_DIR / "index.html")
+    if resp is not None:
         return resp
     return Response("<h1>dist/index.html not found</h1>",
                     mimetype="text/html", status=404)
@@ -57,7 +183,8 @@ def serve_favicon():
     dist_ico = DIST_DIR / "favicon.ico"
     ico = str(dist_ico) if dist_ico.exists() else os.path.join(SCRIPT_DIR, "favicon.ico")
     if os.path.exists(ico):
-        return send_file(ico, mimetype="image/x-icon")
+        # send_file 自带 ETag / Last-Modified 条件响应; 允许缓存一天, 之后回源校验 (多为 304)
+        return send_file(ico, mimetype="image/x-icon", max_age=86400)
     return "", 204
 
 
@@ -78,31 +205,38 @@ def serve_logo_small():
 
 @bp.route("/fonts/<path:filename>")
 def serve_fonts(filename):
-    fonts_dir = (DIST_DIR / "fonts").resolve()
-    safe_path = (fonts_dir / filename).resolve()
-    if not str(safe_path).startswith(str(fonts_dir) + os.sep):
+    path = _safe_join(_FONTS_DIR, filename)
+    if path is None:
         return "", 403
-    if safe_path.exists() and safe_path.is_file():
-        resp = send_file(str(safe_path), mimetype="font/woff2" if filename.endswith(".woff2") else None)
-        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
-        return resp
+    if _is_regular_file(path):
+        return _send_static(path, "font/woff2" if filename.endswith(".woff2") else None)
     return "", 404
 
 
 @bp.route("/assets/<path:filename>")
 def serve_assets(filename):
     """Serve Vite build output assets (CSS/JS bundles)."""
-    assets_dir = (DIST_DIR / "assets").resolve()
-    safe_path = (assets_dir / filename).resolve()
-    if not str(safe_path).startswith(str(assets_dir) + os.sep):
+    path = _safe_join(_ASSETS_DIR, filename)
+    if path is None:
         return "", 403
-    if safe_path.exists() and safe_path.is_file():
-        mime = None
-        if filename.endswith(".js"):
-            mime = "application/javascript"
-        elif filename.endswith(".css"):
-            mime = "text/css"
-        resp = send_file(str(safe_path), mimetype=mime)
-        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
-        return resp
-    return "", 404
+    mime = _COMPRESSIBLE_ASSETS.get(os.path.splitext(path)[1])
+    if mime is None:
+        if not _is_regular_file(path):
+            return "", 404
+        return _send_static(path)
+
+    # 文本资源从内存返回预压缩版本 (JS/CSS 通常可压缩 70% 以上);
+    # _load_compressed 的 stat 兼做存在性检查, 目录 / 不存在均抛 OSError
+    try:
+        bodies, etag, _ = _load_compressed(Path(path), _ASSET_BR_QUALITY)
+    except OSError:
+        return "", 404
+    encoding = _pick_encoding(bodies)
+    resp = Response(bodies[encoding], mimetype=mime)
+    if encoding != "identity":
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.set_etag(etag if encoding == "identity" else f"{etag}-{encoding}")
+    resp = resp.make_conditional(request)
+    resp.headers["Cache-Control"] = _IMMUTABLE_CACHE
+    return resp
@@ -25,7 +25,7 @@ from flask import Blueprint, jsonify, request
 
 from ..config import COMFYUI_DIR, COMFYUI_URL
 from ..services.arch_detect import detect_arch, detect_packaging_from_file
-from ..services.comfyui_bridge import get_bridge
+from ..services.comfyui_bridge import _comfyui_session, get_bridge
 from ..services.prompt_expander import get_expander
 from ..services.workflow_builder import (
     build_sdxl_workflow,
@@ -290,7 +290,7 @@ def _fetch_generate_options() -> dict:
         """
         if node_name not in _combo_cache:
             try:
-                r = requests.get(f"{COMFYUI_URL}/object_info/{node_name}", timeout=10)
+                r = _comfyui_session.get(f"{COMFYUI_URL}/object_info/{node_name}", timeout=10)
                 r.raise_for_status()
                 _combo_cache[node_name] = r.json()
             except Exception as e:
@@ -570,7 +570,7 @@ def api_generate_preprocess():
     try:
         bridge = get_bridge()
         payload = {"prompt": prompt, "client_id": bridge.client_id}
-        resp = requests.post(f"{COMFYUI_URL}/prompt", json=payload, timeout=30)
+        resp = _comfyui_session.post(f"{COMFYUI_URL}/prompt", json=payload, timeout=30)
         resp.raise_for_status()
         result = resp.json()
     except requests.exceptions.ConnectionError:
@@ -940,7 +940,7 @@ def api_generate_submit():
         # 带上 bridge 的 client_id，ComfyUI 才会向我们的 WS 连接发送执行事件
         bridge = get_bridge()
         payload = {"prompt": prompt, "client_id": bridge.client_id}
-        resp = requests.post(
+        resp = _comfyui_session.post(
             f"{COMFYUI_URL}/prompt",
             json=payload,
             timeout=30,
@@ -1119,7 +1119,7 @@ def api_generate_interrogate():
     try:
         bridge = get_bridge()
         payload = {"prompt": prompt, "client_id": bridge.client_id}
-        resp = requests.post(f"{COMFYUI_URL}/prompt", json=payload, timeout=30)
+        resp = _comfyui_session.post(f"{COMFYUI_URL}/prompt", json=payload, timeout=30)
         resp.raise_for_status()
         result = resp.json()
     except requests.exceptions.ConnectionError:
@@ -1149,7 +1149,7 @@ def api_generate_interrogate_result():
         return jsonify({"error": "prompt_id 必填"}), 400
 
     try:
-        resp = requests.get(f"{COMFYUI_URL}/history/{prompt_id}", timeout=10)
+        resp = _comfyui_session.get(f"{COMFYUI_URL}/history/{prompt_id}", timeout=10)
         resp.raise_for_status()
         data = resp.json()
     except Exception as e:
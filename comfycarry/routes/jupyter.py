@@ -17,30 +17,101 @@ import json
 import os
 import re
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
 
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
 
 from flask import Blueprint, Response, jsonify, request
 
+from ..config import _json_dumps
+from ..utils import _log_level, _pm2_jlist_invalidate, _pm2_proc, _tail_lines
+
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 bp = Blueprint("jupyter", __name__)
 
 # PM2 进程名
 PM2_NAME = "jupyter"
+# jupyter_start 通过 pm2 --log 指定的合并日志文件
+JUPYTER_LOG_FILE = "/workspace/jupyter.log"
+
+# Jupyter REST 调用共用的 keep-alive Session (状态页轮询 + 终端/内核操作), 复用本机连接
+_jupyter_session = requests.Session()
+_jupyter_session.verify = False
+_jupyter_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+
+# 状态页的 kernels / sessions / terminals / kernelspecs 四个查询并发执行, 耗时取最慢一个而非求和
+_probe_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="jupyter-probe")
+_STATUS_PROBES = ("/api/kernels", "/api/sessions", "/api/terminals", "/api/kernelspecs")
+
+# /api/jupyter/status 结果短时缓存: 每次计算要扫描进程 + 5 个 REST 请求, 多标签页轮询时合并
+_STATUS_TTL = 1.0
+# (monotonic 时间戳, 状态 dict | None) — 整体赋值发布, 读路径不加锁
+_status_cache = (float("-inf"), None)
+_status_lock = threading.Lock()
+# 失效代数: 采集期间被 _invalidate_status() 递增时, 采集结果视为过期, 不写入缓存
+_status_gen = 0
 
 
 # ── 动态检测 ─────────────────────────────────────────────────
+# 直接读 /proc/<pid>/cmdline 查找 Jupyter 进程, 不再 fork sh + ps + grep
+
+_JUPYTER_MARKERS = (b"jupyter-lab", b"jupyter-notebook")
+_RE_PORT = re.compile(rb'--port[=\s]+(\d+)')
+_RE_TOKEN = re.compile(
+    rb'(?:IdentityProvider|Lab|Server|Notebook)(?:App)?\.token[=\s]+([a-f0-9]{30,})'
+)
+_CLK_TCK = os.sysconf("SC_CLK_TCK")
+_RE_ANSI = re.compile(r'\x1b\[[0-9;]*m')
+
+# 上次找到的 Jupyter 主进程 PID; 命令行仍匹配时直接复用, 省去遍历 /proc
+_jupyter_pid = None
+
+
+def _read_cmdline(pid) -> bytes:
+    """进程命令行 (NUL 分隔转为空格); 进程已退出 / 无权限时返回空 bytes"""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().replace(b"\0", b" ")
+    except OSError:
+        return b""
+
+
+def _iter_cmdlines():
+    """按 PID 升序遍历 (pid, cmdline)"""
+    pids = sorted(int(name) for name in os.listdir("/proc") if name.isdigit())
+    for pid in pids:
+        cmd = _read_cmdline(pid)
+        if cmd:
+            yield pid, cmd
+
+
+def _find_jupyter_proc():
+    """查找 Jupyter 主进程, 返回 (pid, cmdline); 未运行时 (None, b"")"""
+    global _jupyter_pid
+    pid = _jupyter_pid
+    if pid:
+        cmd = _read_cmdline(pid)
+        if any(m in cmd for m in _JUPYTER_MARKERS):
+            return pid, cmd
+    for pid, cmd in _iter_cmdlines():
+        if any(m in cmd for m in _JUPYTER_MARKERS):
+            _jupyter_pid = pid
+            return pid, cmd
+    _jupyter_pid = None
+    return None, b""
+
 
 def _detect_port() -> int | None:
     """从运行中的 Jupyter 进程命令行检测端口"""
     try:
-        out = subprocess.run(
-            "ps aux | grep '[j]upyter-lab\\|[j]upyter-notebook'",
-            shell=True, capture_output=True, text=True, timeout=3
-        ).stdout
-        m = re.search(r'--port[=\s]+(\d+)', out)
+        _, cmd = _find_jupyter_proc()
+        m = _RE_PORT.search(cmd)
         if m:
             return int(m.group(1))
     except Exception:
@@ -74,17 +145,13 @@ def _detect_token() -> str:
         pass
     # 回退: 从进程命令行检测
     try:
-        out = subprocess.run(
-            "ps aux | grep jupyter",
-            shell=True, capture_output=True, text=True, timeout=3
-        ).stdout
-        m = re.search(
-            r'(?:IdentityProvider|Lab|Server|Notebook)(?:App)?\.token[=\s]+([a-f0-9]{30,})',
-            out
-        )
-        if m:
-            _cached_token = m.group(1)
-            return _cached_token
+        for _, cmd in _iter_cmdlines():
+            if b"jupyter" not in cmd:
+                continue
+            m = _RE_TOKEN.search(cmd)
+            if m:
+                _cached_token = m.group(1).decode("ascii")
+                return _cached_token
     except Exception:
         pass
     return ""
@@ -98,31 +165,50 @@ def _jupyter_url() -> str | None:
     return f"http://localhost:{port}"
 
 
+# (token, 请求头 dict): token 未变时复用同一个 dict (requests 合并请求头时不会修改它)
+_auth_headers: tuple[str, dict] = ("", {})
+
+
 def _jupyter_headers() -> dict:
-    """构建 Jupyter API 请求头"""
+    """构建 Jupyter API 请求头 (只读; token 变化 / 缓存清除后自动重建)"""
+    global _auth_headers
     token = _detect_token()
-    return {"Authorization": f"token {token}"} if token else {}
+    cached_token, headers = _auth_headers
+    if token != cached_token:
+        headers = {"Authorization": f"token {token}"} if token else {}
+        _auth_headers = (token, headers)
+    return headers
 
 
-def _jupyter_get(path, timeout=5):
-    """发送 GET 请求到 Jupyter REST API"""
-    url = _jupyter_url()
+def _jupyter_get(path, timeout=5, base=None, headers=None):
+    """发送 GET 请求到 Jupyter REST API (未传 base / headers 时现场检测)"""
+    url = base or _jupyter_url()
     if not url:
         return None
-    return requests.get(f"{url}{path}", headers=_jupyter_headers(),
-                        verify=False, timeout=timeout)
+    if headers is None:
+        headers = _jupyter_headers()
+    return _jupyter_session.get(f"{url}{path}", headers=headers, timeout=timeout)
+
+
+def _proc_cpu_percent(pid) -> float:
+    """进程生命周期内平均 CPU% (与 ps aux 的 %CPU 口径相同: CPU 时间 / 已运行时间)"""
+    with open(f"/proc/{pid}/stat", "rb") as f:
+        # comm 字段可能含空格, 从最后一个 ')' 之后再切分; fields[0] 为第 3 个字段 state
+        fields = f.read().rsplit(b")", 1)[1].split()
+    utime, stime, start = int(fields[11]), int(fields[12]), int(fields[19])
+    with open("/proc/uptime", "rb") as f:
+        uptime = float(f.read().split()[0])
+    elapsed = uptime - start / _CLK_TCK
+    if elapsed <= 0:
+        return 0.0
+    return round((utime + stime) / _CLK_TCK * 100 / elapsed, 1)
 
 
 def _get_jupyter_pid():
     """获取 Jupyter 主进程 PID 和资源占用"""
     try:
-        out = subprocess.run(
-            "ps aux | grep '[j]upyter-lab\\|[j]upyter-notebook' | head -1",
-            shell=True, capture_output=True, text=True, timeout=3
-        ).stdout.strip()
-        if out:
-            parts = out.split()
-            pid = int(parts[1])
+        pid, _ = _find_jupyter_proc()
+        if pid:
             mem = 0
             try:
                 with open(f"/proc/{pid}/status") as f:
@@ -132,7 +218,10 @@ def _get_jupyter_pid():
                             break
             except Exception:
                 pass
-            cpu = float(parts[2]) if len(parts) > 2 else 0
+            try:
+                cpu = _proc_cpu_percent(pid)
+            except Exception:
+                cpu = 0
             return {"pid": pid, "cpu": cpu, "memory": mem}
     except Exception:
         pass
@@ -141,24 +230,51 @@ def _get_jupyter_pid():
 
 def _pm2_status() -> str:
     """获取 jupyter PM2 进程状态: online / stopped / errored / not_found"""
-    try:
-        r = subprocess.run(
-            "pm2 jlist 2>/dev/null", shell=True,
-            capture_output=True, text=True, timeout=5
-        )
-        if r.returncode == 0:
-            for p in json.loads(r.stdout):
-                if p.get("name") == PM2_NAME:
-                    return p.get("pm2_env", {}).get("status", "unknown")
-    except Exception:
-        pass
-    return "not_found"
+    p = _pm2_proc(PM2_NAME)
+    return p.get("pm2_env", {}).get("status", "unknown") if p else "not_found"
+
+
+def _invalidate_status():
+    """启停 / 终端 / 内核操作之后调用, 下次状态查询必定重新采集"""
+    global _status_cache, _status_gen
+    _status_gen += 1
+    _status_cache = (float("-inf"), None)
+
+
+def _invalidates_status(view):
+    """装饰会改变 Jupyter 状态的端点: 处理完成后丢弃状态缓存"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _invalidate_status()
+    return wrapper
 
 # ── API 端点 ──────────────────────────────────────────────────
 
 @bp.route("/api/jupyter/status")
 def jupyter_status():
-    """Jupyter 状态概览"""
+    """Jupyter 状态概览 (缓存 _STATUS_TTL 秒; ?nocache=1 强制重新采集)"""
+    global _status_cache
+    use_cache = request.args.get("nocache") != "1"
+    ts, data = _status_cache
+    if use_cache and data is not None and time.monotonic() - ts < _STATUS_TTL:
+        return jsonify(data)
+    with _status_lock:
+        ts, data = _status_cache
+        # 等锁期间已被其他请求刷新则直接复用
+        if not use_cache or data is None or time.monotonic() - ts >= _STATUS_TTL:
+            gen = _status_gen
+            data = _collect_status()
+            # 采集期间有变更操作使缓存失效: 本次结果可能是变更前的状态, 只返回不缓存
+            if gen == _status_gen:
+                _status_cache = (time.monotonic(), data)
+    return jsonify(data)
+
+
+def _collect_status():
+    """采集 Jupyter 状态 (进程 / PM2 / REST API)"""
     port = _detect_port()
     pm2 = _pm2_status()
 
@@ -182,9 +298,15 @@ def jupyter_status():
         result["cpu"] = proc["cpu"]
         result["memory"] = proc["memory"]
 
+    # 端口已检测过, 后续请求复用, 不再每次 ps aux
+    base = f"http://localhost:{port}" if port else None
+    if not base:
+        return result
+    headers = _jupyter_headers()
+
     # API 健康检查 + 版本
     try:
-        r = _jupyter_get("/api")
+        r = _jupyter_get("/api", base=base, headers=headers)
         if r and r.ok:
             result["online"] = True
             d = r.json()
@@ -193,11 +315,16 @@ def jupyter_status():
         pass
 
     if not result["online"]:
-        return jsonify(result)
+        return result
+
+    probes = {
+        path: _probe_pool.submit(_jupyter_get, path, base=base, headers=headers)
+        for path in _STATUS_PROBES
+    }
 
     # Kernels
     try:
-        r = _jupyter_get("/api/kernels")
+        r = probes["/api/kernels"].result()
         if r and r.ok:
             kernels = r.json()
             result["kernels_count"] = len(kernels)
@@ -213,7 +340,7 @@ def jupyter_status():
 
     # Sessions
     try:
-        r = _jupyter_get("/api/sessions")
+        r = probes["/api/sessions"].result()
         if r and r.ok:
             sessions = r.json()
             result["sessions_count"] = len(sessions)
@@ -231,7 +358,7 @@ def jupyter_status():
 
     # Terminals
     try:
-        r = _jupyter_get("/api/terminals")
+        r = probes["/api/terminals"].result()
         if r and r.ok:
             terminals = r.json()
             result["terminals_count"] = len(terminals)
@@ -244,7 +371,7 @@ def jupyter_status():
 
     # Kernel specs
     try:
-        r = _jupyter_get("/api/kernelspecs")
+        r = probes["/api/kernelspecs"].result()
         if r and r.ok:
             specs = r.json()
             result["default_kernel"] = specs.get("default", "")
@@ -255,34 +382,36 @@ def jupyter_status():
     except Exception:
         pass
 
-    return jsonify(result)
+    return result
 
 
 @bp.route("/api/jupyter/terminals/new", methods=["POST"])
+@_invalidates_status
 def jupyter_new_terminal():
     """创建新终端"""
     try:
         base = _jupyter_url()
         if not base:
             return jsonify({"error": "JupyterLab 未运行"}), 503
-        r = requests.post(f"{base}/api/terminals", headers=_jupyter_headers(),
-                          verify=False, timeout=5)
+        r = _jupyter_session.post(f"{base}/api/terminals", headers=_jupyter_headers(),
+                                  timeout=5)
         if r.ok:
-            return jsonify(r.json())
+            return Response(r.content, mimetype="application/json")
         return jsonify({"error": "Failed to create terminal"}), 502
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @bp.route("/api/jupyter/terminals/<name>", methods=["DELETE"])
+@_invalidates_status
 def jupyter_delete_terminal(name):
     """销毁终端"""
     try:
         base = _jupyter_url()
         if not base:
             return jsonify({"error": "JupyterLab 未运行"}), 503
-        r = requests.delete(f"{base}/api/terminals/{name}",
-                            headers=_jupyter_headers(), verify=False, timeout=5)
+        r = _jupyter_session.delete(f"{base}/api/terminals/{name}",
+                                    headers=_jupyter_headers(), timeout=5)
         if r.ok or r.status_code == 204:
             return jsonify({"ok": True})
         return jsonify({"error": "Delete terminal failed"}), 502
@@ -291,6 +420,7 @@ def jupyter_delete_terminal(name):
 
 
 @bp.route("/api/jupyter/kernels/<kernel_id>/<action>", methods=["POST"])
+@_invalidates_status
 def jupyter_kernel_action(kernel_id, action):
     """内核操作: restart, interrupt"""
     if action not in ("restart", "interrupt"):
@@ -299,8 +429,8 @@ def jupyter_kernel_action(kernel_id, action):
         base = _jupyter_url()
         if not base:
             return jsonify({"error": "JupyterLab 未运行"}), 503
-        r = requests.post(f"{base}/api/kernels/{kernel_id}/{action}",
-                          headers=_jupyter_headers(), verify=False, timeout=10)
+        r = _jupyter_session.post(f"{base}/api/kernels/{kernel_id}/{action}",
+                                  headers=_jupyter_headers(), timeout=10)
         if r.ok:
             return jsonify({"ok": True})
         return jsonify({"error": f"Kernel {action} failed"}), 502
@@ -309,14 +439,15 @@ def jupyter_kernel_action(kernel_id, action):
 
 
 @bp.route("/api/jupyter/sessions/<session_id>", methods=["DELETE"])
+@_invalidates_status
 def jupyter_delete_session(session_id):
     """关闭会话 (同时关闭内核)"""
     try:
         base = _jupyter_url()
         if not base:
             return jsonify({"error": "JupyterLab 未运行"}), 503
-        r = requests.delete(f"{base}/api/sessions/{session_id}",
-                            headers=_jupyter_headers(), verify=False, timeout=5)
+        r = _jupyter_session.delete(f"{base}/api/sessions/{session_id}",
+                                    headers=_jupyter_headers(), timeout=5)
         if r.ok or r.status_code == 204:
             return jsonify({"ok": True})
         return jsonify({"error": "Delete session failed"}), 502
@@ -327,16 +458,20 @@ def jupyter_delete_session(session_id):
 @bp.route("/api/jupyter/logs")
 def jupyter_logs():
     """获取 Jupyter 日志 (PM2)"""
-    lines = min(int(request.args.get("lines", "200")), 2000)
+    lines = max(0, min(request.args.get("lines", 200, type=int), 2000))
     try:
-        r = subprocess.run(
-            f"pm2 logs {PM2_NAME} --nostream --lines {lines} 2>/dev/null",
-            shell=True, capture_output=True, text=True, timeout=5
-        )
-        raw = r.stdout + r.stderr
+        try:
+            # 直接读日志文件末尾, 不再为每次请求起 shell + pm2 (node) 进程
+            raw = _tail_lines(JUPYTER_LOG_FILE, lines)
+        except OSError:
+            # 非本面板启动 (无日志文件) 时回退 pm2 logs
+            r = subprocess.run(
+                ["pm2", "logs", PM2_NAME, "--nostream", "--lines", str(lines)],
+                capture_output=True, text=True, timeout=5
+            )
+            raw = r.stdout + r.stderr
         # 移除 ANSI 颜色码
-        ansi_re = re.compile(r'\x1b\[[0-9;]*m')
-        clean = ansi_re.sub('', raw)
+        clean = _RE_ANSI.sub('', raw)
         return jsonify({"logs": clean})
     except Exception as e:
         return jsonify({"logs": "", "error": str(e)})
@@ -359,12 +494,8 @@ def jupyter_logs_stream():
                 line = line.rstrip('\n')
                 if not line:
                     continue
-                lvl = "info"
-                if re.search(r'error|exception|traceback', line, re.I):
-                    lvl = "error"
-                elif re.search(r'warn', line, re.I):
-                    lvl = "warn"
-                yield f"data: {json.dumps({'line': line, 'level': lvl}, ensure_ascii=False)}\n\n"
+                lvl = _log_level(line)
+                yield b"data: " + _json_dumps({'line': line, 'level': lvl}) + b"\n\n"
         except GeneratorExit:
             pass
         finally:
@@ -382,6 +513,7 @@ def jupyter_logs_stream():
 
 
 @bp.route("/api/jupyter/start", methods=["POST"])
+@_invalidates_status
 def jupyter_start():
     """启动 JupyterLab (PM2)"""
     pm2 = _pm2_status()
@@ -397,7 +529,7 @@ def jupyter_start():
         cmd = (
             f'pm2 start jupyter-lab --name {PM2_NAME} '
             f'--interpreter none '
-            f'--log /workspace/jupyter.log --time '
+            f'--log {JUPYTER_LOG_FILE} --time '
             f'-- --ip=0.0.0.0 --port=8888 --no-browser --allow-root '
             f'--ServerApp.root_dir=/workspace '
             f'--ServerApp.language=zh_CN'
@@ -408,6 +540,7 @@ def jupyter_start():
 
     try:
         r = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=10)
+        _pm2_jlist_invalidate()
         subprocess.run("pm2 save 2>/dev/null", shell=True)
         if r.returncode == 0:
             return jsonify({"ok": True, "message": "JupyterLab 启动中..."})
@@ -417,11 +550,13 @@ def jupyter_start():
 
 
 @bp.route("/api/jupyter/stop", methods=["POST"])
+@_invalidates_status
 def jupyter_stop():
     """停止 JupyterLab (PM2)"""
     try:
         subprocess.run(f"pm2 stop {PM2_NAME} 2>/dev/null",
                        shell=True, timeout=10)
+        _pm2_jlist_invalidate()
         global _cached_token
         _cached_token = None
         return jsonify({"ok": True, "message": "JupyterLab 已停止"})
@@ -430,11 +565,13 @@ def jupyter_stop():
 
 
 @bp.route("/api/jupyter/restart", methods=["POST"])
+@_invalidates_status
 def jupyter_restart():
     """重启 JupyterLab (PM2)"""
     try:
         r = subprocess.run(f"pm2 restart {PM2_NAME} 2>/dev/null",
                            shell=True, capture_output=True, text=True, timeout=10)
+        _pm2_jlist_invalidate()
         global _cached_token
         _cached_token = None
         if r.returncode == 0:
@@ -7,10 +7,16 @@ ComfyCarry — 模型管理路由
 - Enhanced-Civicomfy 下载代理
 """
 
+import atexit
+import gzip
+import hashlib
 import json
 import logging
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import requests
@@ -23,34 +29,144 @@ from ..config import (
     MEILI_URL,
     MODEL_DIRS,
     MODEL_EXTENSIONS,
+    MODEL_EXTENSION_SUFFIXES,
+    _json_dumps,
     get_extra_model_paths,
 )
-from ..services.civitai_resolver import enrich_model_by_hash
+from ..services.civitai_resolver import civitai_api_get, enrich_model_by_hash, get_http_session
 from ..utils import _get_api_key, _run_cmd, _sha256_file
 
 logger = logging.getLogger(__name__)
 
 bp = Blueprint("models", __name__)
 
+# 与 civitai_resolver 共享的 requests Session (同一 keep-alive 连接池)
+_http_session = get_http_session()
+
 
 # ====================================================================
 # CivitAI 搜索代理 (Meilisearch CORS bypass)
 # ====================================================================
+_meili_client = None  # httpx.Client(http2=True); False = httpx/h2 不可用
+_meili_client_lock = threading.Lock()
+
+
+def _get_meili_client():
+    """
+    惰性创建共享的 HTTP/2 httpx 客户端 (search.civitai.com 支持 h2, 突发搜索可在单连接上多路复用).
+
+    httpx / h2 为可选依赖, 未安装时返回 None, 调用方回退到 requests Session (HTTP/1.1).
+    """
+    global _meili_client
+    if _meili_client is None:
+        with _meili_client_lock:
+            if _meili_client is None:
+                try:
+                    import h2  # noqa: F401 — httpx 的 http2 支持依赖 h2
+                    import httpx
+                    _meili_client = httpx.Client(http2=True, timeout=10)
+                    atexit.register(_meili_client.close)
+                except ImportError:
+                    _meili_client = False
+    return _meili_client or None
+
+
+# 小于此大小的 JSON 不压缩 (gzip 头开销 + CPU 不划算)
+_GZIP_MIN_SIZE = 1024
+
+
+def _json_response(body: bytes, status: int = 200, headers: dict | None = None) -> Response:
+    """返回 JSON 字节; 客户端接受 gzip 且体积够大时压缩 (搜索/模型详情 JSON 可压 4-5 倍)."""
+    resp = Response(body, status=status, mimetype="application/json", headers=headers)
+    resp.headers["Vary"] = "Accept-Encoding"
+    if len(body) >= _GZIP_MIN_SIZE and request.accept_encodings["gzip"]:
+        # level 5: 压缩率接近 9, 但 CPU 开销小得多 (每次请求都要压)
+        resp.set_data(gzip.compress(body, 5))
+        resp.headers["Content-Encoding"] = "gzip"
+    return resp
+
+
+# ── 代理响应缓存 ──
+# 分面统计 (每次打开页面的 limit:0 空搜索)、常见搜索和模型详情在几分钟内几乎不变,
+# 命中时直接从内存返回, 不再回源 Meilisearch / CivitAI。只缓存 200 响应。
+# key → (expires_at, {encoding: body}, etag)
+_PROXY_CACHE_MAX = 256
+_SEARCH_CACHE_TTL = 300
+_MODEL_CACHE_TTL = 600
+# 浏览器侧: 1 分钟内直接用本地副本, 之后带 If-None-Match 回源校验
+_MODEL_CACHE_CONTROL = "private, max-age=60, stale-while-revalidate=300"
+_proxy_cache: dict[tuple, tuple[float, dict[str, bytes], str]] = {}
+_proxy_cache_lock = threading.Lock()
+
+
+def _proxy_cache_get(key: tuple):
+    with _proxy_cache_lock:
+        entry = _proxy_cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry
+        if entry:
+            del _proxy_cache[key]
+    return None
+
+
+def _proxy_cache_put(key: tuple, ttl: float, body: bytes):
+    bodies = {"identity": body}
+    if len(body) >= _GZIP_MIN_SIZE:
+        bodies["gzip"] = gzip.compress(body, 5)
+    entry = (time.monotonic() + ttl, bodies, hashlib.sha256(body).hexdigest()[:32])
+    with _proxy_cache_lock:
+        if len(_proxy_cache) >= _PROXY_CACHE_MAX:
+            # 先清过期项, 仍满则按插入顺序淘汰最早的
+            now = time.monotonic()
+            for k in [k for k, v in _proxy_cache.items() if v[0] <= now]:
+                del _proxy_cache[k]
+            while len(_proxy_cache) >= _PROXY_CACHE_MAX:
+                del _proxy_cache[next(iter(_proxy_cache))]
+        _proxy_cache[key] = entry
+    return entry
+
+
+def _cached_json_response(entry, cache_control: str | None = None) -> Response:
+    """由缓存项构造响应: 按 Accept-Encoding 选预压缩版本, 带 ETag, If-None-Match → 304."""
+    _, bodies, etag = entry
+    encoding = "gzip" if "gzip" in bodies and request.accept_encodings["gzip"] else "identity"
+    resp = Response(bodies[encoding], mimetype="application/json")
+    resp.headers["Vary"] = "Accept-Encoding"
+    if encoding != "identity":
+        resp.headers["Content-Encoding"] = encoding
+    resp.set_etag(etag if encoding == "identity" else f"{etag}-{encoding}")
+    if cache_control:
+        resp.headers["Cache-Control"] = cache_control
+    return resp.make_conditional(request)
+
+
 @bp.route("/api/search", methods=["POST"])
 def proxy_search():
     try:
-        data = request.get_json(force=True, silent=True)
-        if not data:
+        # 原样转发请求体: 不在 worker 线程里做 JSON 解析 + 重新序列化, Meilisearch 自行校验
+        body = request.get_data()
+        if not body.strip():
             return jsonify({"error": "No JSON body"}), 400
 
+        cache_key = ("search", hashlib.sha256(body).digest())
+        cached = _proxy_cache_get(cache_key)
+        if cached:
+            return _cached_json_response(cached)
+
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {MEILI_BEARER}",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         }
 
-        resp = requests.post(MEILI_URL, headers=headers, json=data, timeout=10)
-        return Response(resp.content, status=resp.status_code, mimetype="application/json")
+        client = _get_meili_client()
+        if client:
+            resp = client.post(MEILI_URL, headers=headers, content=body)
+        else:
+            resp = _http_session.post(MEILI_URL, headers=headers, data=body, timeout=10)
+        if resp.status_code == 200:
+            return _cached_json_response(_proxy_cache_put(cache_key, _SEARCH_CACHE_TTL, resp.content))
+        return _json_response(resp.content, resp.status_code)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -58,30 +174,148 @@ def proxy_search():
 # ====================================================================
 # CivitAI Model API Proxy (统一前端对 civitai.com 的请求)
 # ====================================================================
+# 透传给前端的限流相关响应头 (前端据此退避, 见 useCivitaiSearch)
+_RATE_LIMIT_HEADERS = ("Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset")
+
+
+def _civitai_api_headers(api_key: str) -> dict:
+    headers = {
+        "Content-Type": "application/json",
+        "User-Agent": "ComfyCarry/1.0",
+    }
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    return headers
+
+
+def _proxy_response(resp) -> Response:
+    """把上游 CivitAI 响应原样转给前端, 保留限流响应头."""
+    headers = {h: resp.headers[h] for h in _RATE_LIMIT_HEADERS if h in resp.headers}
+    return _json_response(resp.content, resp.status_code, headers)
+
+
 @bp.route("/api/civitai/model/<int:model_id>", methods=["GET"])
 def proxy_civitai_model(model_id: int):
     """代理 CivitAI v1 models/{id} API, 避免前端直接跨域请求."""
     try:
         api_key = _get_api_key()
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "ComfyCarry/1.0",
-        }
-        if api_key:
-            headers["Authorization"] = f"Bearer {api_key}"
-
-        resp = requests.get(
+        # API Key 影响可见内容 (如需登录的模型), 纳入缓存键
+        cache_key = ("model", model_id, api_key)
+        cached = _proxy_cache_get(cache_key)
+        if cached:
+            return _cached_json_response(cached, _MODEL_CACHE_CONTROL)
+        headers = _civitai_api_headers(api_key)
+
+        resp = _http_session.get(
             f"https://civitai.com/api/v1/models/{model_id}",
             headers=headers,
             timeout=30,
         )
-        return Response(resp.content, status=resp.status_code, mimetype="application/json")
+        if resp.status_code == 200:
+            return _cached_json_response(
+                _proxy_cache_put(cache_key, _MODEL_CACHE_TTL, resp.content),
+                _MODEL_CACHE_CONTROL,
+            )
+        return _proxy_response(resp)
     except requests.Timeout:
         return jsonify({"error": "CivitAI API 请求超时"}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 502
 
 
+_CIVITAI_IDS_MAX = 100
+
+
+@bp.route("/api/civitai/models", methods=["GET"])
+def proxy_civitai_models():
+    """代理 CivitAI v1 models?ids= 列表 API, 一次请求批量查询多个模型."""
+    ids = [i.strip() for i in request.args.get("ids", "").split(",") if i.strip().isdigit()]
+    if not ids:
+        return jsonify({"error": "缺少 ids 参数"}), 400
+    if len(ids) > _CIVITAI_IDS_MAX:
+        return jsonify({"error": f"单次最多 {_CIVITAI_IDS_MAX} 个 ID"}), 400
+    try:
+        api_key = _get_api_key()
+        headers = _civitai_api_headers(api_key)
+
+        resp = _http_session.get(
+            "https://civitai.com/api/v1/models",
+            params={"ids": ",".join(ids), "limit": len(ids), "nsfw": "true"},
+            headers=headers,
+            timeout=30,
+        )
+        return _proxy_response(resp)
+    except requests.Timeout:
+        return jsonify({"error": "CivitAI API 请求超时"}), 504
+    except Exception as e:
+        return jsonify({"error": str(e)}), 502
+
+
+_CIVITAI_BATCH_MAX = 50
+_CIVITAI_BATCH_WORKERS = 8
+
+
+def _fetch_civitai_model_cached(model_id: int, api_key: str) -> tuple[bytes | None, str | None]:
+    """取单个模型 JSON (走代理缓存), 返回 (body, error).
+
+    回源经 civitai_api_get, 与其他 CivitAI 调用共享熔断 / 限速 / 退避; 失败时 body 为 None.
+    """
+    cache_key = ("model", model_id, api_key)
+    cached = _proxy_cache_get(cache_key)
+    if cached:
+        return cached[1]["identity"], None
+    try:
+        resp = civitai_api_get(
+            f"https://civitai.com/api/v1/models/{model_id}",
+            headers=_civitai_api_headers(api_key),
+        )
+    except requests.RequestException as e:
+        logger.warning(f"[civitai batch] 模型 {model_id} 请求失败: {e}")
+        return None, str(e)
+    if resp.status_code != 200:
+        return None, "模型不存在" if resp.status_code == 404 else f"HTTP {resp.status_code}"
+    return _proxy_cache_put(cache_key, _MODEL_CACHE_TTL, resp.content)[1]["identity"], None
+
+
+@bp.route("/api/civitai/models/batch", methods=["POST"])
+def proxy_civitai_models_batch():
+    """批量获取模型详情: 一次浏览器请求, 服务端并发回源 (共享连接池 + 代理缓存).
+
+    Body: {"ids": [123, 456, ...]}
+      →  {"models": {"123": {...} | null, ...}, "errors": {"456": "HTTP 429", ...}}
+    errors 只包含取不到的 ID, 前端据此提示被跳过的模型
+    """
+    data = request.get_json(silent=True)
+    raw_ids = data.get("ids") if isinstance(data, dict) else None
+    if not isinstance(raw_ids, list) or not raw_ids:
+        return jsonify({"error": "缺少 ids"}), 400
+    # 先按原始长度拒绝, 超大数组不再逐项解析
+    if len(raw_ids) > _CIVITAI_BATCH_MAX:
+        return jsonify({"error": f"单次最多 {_CIVITAI_BATCH_MAX} 个 ID"}), 400
+    parsed = []
+    for i in raw_ids:
+        s = str(i).strip()
+        # isdigit() 也接受 "²" 等 Unicode 数字, 需同时限定 ASCII
+        if s.isascii() and s.isdigit():
+            try:
+                parsed.append(int(s))
+            except ValueError:  # 超出 int() 的位数上限
+                pass
+    ids = list(dict.fromkeys(parsed))  # 保序去重
+    if not ids:
+        return jsonify({"error": "缺少 ids"}), 400
+
+    api_key = _get_api_key()
+    with ThreadPoolExecutor(max_workers=min(_CIVITAI_BATCH_WORKERS, len(ids))) as pool:
+        fetched = list(pool.map(lambda mid: _fetch_civitai_model_cached(mid, api_key), ids))
+
+    # 直接拼接上游 JSON 字节, 不做解析 + 重新序列化
+    parts = [b'"%d":%s' % (mid, body if body is not None else b"null")
+             for mid, (body, _) in zip(ids, fetched)]
+    errors = {str(mid): err for mid, (_, err) in zip(ids, fetched) if err}
+    return _json_response(b'{"models":{' + b",".join(parts) + b'},"errors":' + _json_dumps(errors) + b"}")
+
+
 # ====================================================================
 # 本地模型管理 API
 # ====================================================================
@@ -725,7 +959,7 @@ def _refresh_object_info() -> dict | None:
                 # combo 选项中有模型扩展名 → 这是模型文件字段
                 if any(
                     isinstance(o, str)
-                    and any(o.lower().endswith(e) for e in MODEL_EXTENSIONS)
+                    and o.lower().endswith(MODEL_EXTENSION_SUFFIXES)
                     for o in options[:20]
                 ):
                     fields[fname] = set(options)
@@ -797,7 +1031,7 @@ def _scan_inline_loras(inputs: dict, ct: str, seen: set, out: list):
             name = m.group(1).strip()
             if not name or name in seen:
                 continue
-            if not any(name.lower().endswith(e) for e in MODEL_EXTENSIONS):
+            if not name.lower().endswith(MODEL_EXTENSION_SUFFIXES):
                 name += ".safetensors"
             if name in seen:
                 continue
@@ -808,7 +1042,7 @@ def _scan_inline_loras(inputs: dict, ct: str, seen: set, out: list):
             name = m.group(1).strip()
             if not name or name in seen:
                 continue
-            if not any(name.lower().endswith(e) for e in MODEL_EXTENSIONS):
+            if not name.lower().endswith(MODEL_EXTENSION_SUFFIXES):
                 name += ".safetensors"
             if name in seen:
                 continue
@@ -1001,7 +1235,7 @@ def _extract_models_from_workflow(workflow: dict) -> tuple[list[dict], list[dict
                         "exists": True,
                         "node": ct, "field": matched_field,
                     })
-                elif any(val.lower().endswith(e) for e in MODEL_EXTENSIONS):
+                elif val.lower().endswith(MODEL_EXTENSION_SUFFIXES):
                     # 有模型扩展名但不在 combo 中 → 可能是缺失的模型
                     fname = next(iter(all_combos))
                     seen.add(val)
@@ -1020,7 +1254,7 @@ def _extract_models_from_workflow(workflow: dict) -> tuple[list[dict], list[dict
                 if (not isinstance(val, str) or not val
                         or val in seen or val in _SENTINEL_VALUES):
                     continue
-                if any(val.lower().endswith(e) for e in MODEL_EXTENSIONS):
+                if val.lower().endswith(MODEL_EXTENSION_SUFFIXES):
                     seen.add(val)
                     # 尝试精确匹配字段名对应的类别 (按白名单键搜索)
                     cat = default_cat
@@ -1046,7 +1280,7 @@ def _extract_models_from_workflow(workflow: dict) -> tuple[list[dict], list[dict
                 name = m.group(1).strip()
                 if not name:
                     continue
-                if not any(name.lower().endswith(e) for e in MODEL_EXTENSIONS):
+                if not name.lower().endswith(MODEL_EXTENSION_SUFFIXES):
                     name += ".safetensors"
                 if name in seen:
                     continue
@@ -1057,7 +1291,7 @@ def _extract_models_from_workflow(workflow: dict) -> tuple[list[dict], list[dict
                 name = m.group(1).strip()
                 if not name:
                     continue
-                if not any(name.lower().endswith(e) for e in MODEL_EXTENSIONS):
+                if not name.lower().endswith(MODEL_EXTENSION_SUFFIXES):
                     name += ".safetensors"
                 if name in seen:
                     continue
@@ -1110,8 +1344,7 @@ def _extract_models_from_workflow(workflow: dict) -> tuple[list[dict], list[dict
                 name = val["content"]
                 if (name and name not in seen
                         and name not in _SENTINEL_VALUES
-                        and any(name.lower().endswith(e)
-                                for e in MODEL_EXTENSIONS)):
+                        and name.lower().endswith(MODEL_EXTENSION_SUFFIXES)):
                     seen.add(name)
                     cat = _get_category(ct, "")
                     models.append({
@@ -20,14 +20,15 @@ from flask import Blueprint, Response, jsonify, request
 from pathlib import Path
 
 from .. import config as cfg
+from ..auth import check_dashboard_password
 from ..config import (
-    CONFIG_FILE, DEFAULT_PLUGINS,
+    DEFAULT_PLUGINS, DEFAULT_PLUGIN_URLS,
     SYNC_RULES_FILE, SYNC_SETTINGS_FILE,
     _load_config, _get_config, _set_config,
     _load_setup_state, _save_setup_state, SETUP_STATE_FILE,
     COMFYUI_DIR,
 )
-from ..utils import _get_api_key
+from ..utils import _get_api_key, _pm2_jlist_invalidate, _pm2_proc, _save_api_key
 from ..services.comfyui_params import parse_comfyui_args
 from ..services.sync_engine import (
     stop_sync_worker, _save_sync_settings,
@@ -62,7 +63,7 @@ def api_settings_password():
         return jsonify({"error": "新密码不能为空"}), 400
     if len(new_pw) < 4:
         return jsonify({"error": "密码至少 4 个字符"}), 400
-    if current != cfg.DASHBOARD_PASSWORD:
+    if not check_dashboard_password(current):
         return jsonify({"error": "当前密码错误"}), 403
 
     cfg.DASHBOARD_PASSWORD = new_pw
@@ -94,7 +95,7 @@ def api_settings_civitai_key():
     """保存或清除 CivitAI API Key"""
     data = request.get_json(force=True) or {}
     key = data.get("api_key", "").strip()
-    CONFIG_FILE.write_text(json.dumps({"api_key": key}))
+    _save_api_key(key)
     return jsonify({"ok": True, "civitai_key_set": bool(key)})
 
 
@@ -105,11 +106,7 @@ def api_settings_export_config():
 
     config["password"] = cfg.DASHBOARD_PASSWORD
 
-    try:
-        if CONFIG_FILE.exists():
-            config["civitai_token"] = json.loads(CONFIG_FILE.read_text()).get("api_key", "")
-    except Exception:
-        pass
+    config["civitai_token"] = _get_api_key()
 
     state = _load_setup_state()
     config["install_fa2"] = state.get("install_fa2", False)
@@ -125,10 +122,12 @@ def api_settings_export_config():
         except Exception:
             pass
 
-    default_urls = {p["url"] for p in DEFAULT_PLUGINS}
     all_plugins = state.get("plugins", [])
-    config["extra_plugins"] = [u for u in all_plugins if u not in default_urls]
-    config["disabled_default_plugins"] = [u for u in default_urls if u not in all_plugins]
+    enabled = set(all_plugins)
+    config["extra_plugins"] = [u for u in all_plugins if u not in DEFAULT_PLUGIN_URLS]
+    config["disabled_default_plugins"] = [
+        p["url"] for p in DEFAULT_PLUGINS if p["url"] not in enabled
+    ]
 
     if SYNC_RULES_FILE.exists():
         try:
@@ -143,10 +142,7 @@ def api_settings_export_config():
             pass
 
     try:
-        r = subprocess.run("pm2 jlist 2>/dev/null", shell=True,
-                           capture_output=True, text=True, timeout=5)
-        procs = json.loads(r.stdout or "[]")
-        comfy = next((p for p in procs if p.get("name") == "comfy"), None)
+        comfy = _pm2_proc("comfy")
         if comfy:
             raw_args = comfy.get("pm2_env", {}).get("args", [])
             if isinstance(raw_args, str):
@@ -243,7 +239,7 @@ def api_settings_import_config():
 
     if data.get("civitai_token"):
         try:
-            CONFIG_FILE.write_text(json.dumps({"api_key": data["civitai_token"]}))
+            _save_api_key(data["civitai_token"])
             applied.append("CivitAI API Key")
         except Exception as e:
             errors.append(f"CivitAI: {e}")
@@ -394,6 +390,7 @@ def api_settings_reinitialize():
         subprocess.run("pm2 delete sync 2>/dev/null || true", shell=True, timeout=15)
     except Exception as e:
         errors.append(f"停止服务失败: {e}")
+    _pm2_jlist_invalidate()
 
     # 2) 强制结束所有可能残留的 ComfyUI 进程
     try:
@@ -13,7 +13,6 @@ ComfyCarry — SSH 管理路由
 - /api/ssh/logs/stream — SSE 实时日志流
 """
 
-import json
 import os
 import re
 import subprocess
@@ -22,7 +21,7 @@ import time
 
 from flask import Blueprint, Response, jsonify, request
 
-from ..config import _get_config, _set_config
+from ..config import _get_config, _json_dumps, _set_config
 
 bp = Blueprint("ssh", __name__)
 
@@ -627,7 +626,7 @@ def ssh_logs_stream():
                     lvl = "warn"
                 elif re.search(r'accepted|session opened|publickey', line, re.I):
                     lvl = "info"
-                yield f"data: {json.dumps({'line': line, 'level': lvl}, ensure_ascii=False)}\n\n"
+                yield b"data: " + _json_dumps({'line': line, 'level': lvl}) + b"\n\n"
         except GeneratorExit:
             pass
         finally:
@@ -24,7 +24,7 @@ from flask import Blueprint, jsonify, request, Response
 from pathlib import Path
 
 from ..config import (
-    COMFYUI_DIR, RCLONE_CONF, SYNC_RULE_TEMPLATES, REMOTE_TYPE_DEFS,
+    COMFYUI_DIR, RCLONE_CONF, SYNC_RULE_TEMPLATES, REMOTE_TYPE_DEFS, _json_dumps,
 )
 from ..services.sync_engine import (
     _load_sync_rules, _save_sync_rules, _parse_rclone_conf,
@@ -33,6 +33,7 @@ from ..services.sync_engine import (
     get_current_job_id,
     is_worker_running, start_sync_worker, stop_sync_worker,
 )
+from ..utils import _pm2_proc
 
 bp = Blueprint("sync", __name__)
 
@@ -43,17 +44,8 @@ bp = Blueprint("sync", __name__)
 @bp.route("/api/sync/status")
 def api_sync_status():
     worker_running = is_worker_running()
-    pm2_status = "stopped"
-    try:
-        r = subprocess.run("pm2 jlist 2>/dev/null", shell=True,
-                           capture_output=True, text=True, timeout=5)
-        if r.returncode == 0:
-            for p in json.loads(r.stdout or "[]"):
-                if p.get("name") == "sync":
-                    pm2_status = p.get("pm2_env", {}).get("status", "unknown")
-                    break
-    except Exception:
-        pass
+    p = _pm2_proc("sync")
+    pm2_status = p.get("pm2_env", {}).get("status", "unknown") if p else "stopped"
 
     log_lines = get_sync_log_buffer()
     rules = _load_sync_rules()
@@ -83,7 +75,7 @@ def api_sync_logs_stream():
                 current_count = len(entries)
                 if current_count > last_count:
                     for entry in entries[last_count:]:
-                        yield f"data: {json.dumps(entry)}\n\n"
+                        yield b"data: " + _json_dumps(entry) + b"\n\n"
                     last_count = current_count
                 elif current_count < last_count:
                     last_count = current_count
@@ -232,9 +224,15 @@ def api_sync_local_browse():
         return jsonify({"error": str(e)}), 500
 
 
+# 静态表, 导入时序列化一次; 与 jsonify 一样按键排序, 前端类型下拉顺序不变
+_REMOTE_TYPES_BODY = json.dumps(
+    {"types": REMOTE_TYPE_DEFS}, sort_keys=True, ensure_ascii=False
+).encode("utf-8")
+
+
 @bp.route("/api/sync/remote/types")
 def api_sync_remote_types():
-    return jsonify({"types": REMOTE_TYPE_DEFS})
+    return Response(_REMOTE_TYPES_BODY, mimetype="application/json")
 
 
 @bp.route("/api/sync/storage")
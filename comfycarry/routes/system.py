@@ -19,8 +19,8 @@ from flask import Blueprint, jsonify, request, Response
 
 import requests as req_lib
 
-from ..config import SCRIPT_DIR, COMFYUI_URL, APP_VERSION
-from ..utils import _run_cmd
+from ..config import SCRIPT_DIR, COMFYUI_URL, APP_VERSION, _json_dumps
+from ..utils import _log_level, _pm2_jlist_invalidate, _run_cmd
 from ..services import system_monitor
 
 bp = Blueprint("system", __name__)
@@ -116,6 +116,7 @@ def api_service_action(name, action):
     if not re.match(r'^[\w\-]+$', name):
         return jsonify({"error": "Invalid service name"}), 400
     out = _run_cmd(f"pm2 {action} {name}", timeout=10)
+    _pm2_jlist_invalidate()
     return jsonify({"ok": True, "output": out})
 
 
@@ -159,12 +160,8 @@ def api_logs_stream(name):
                 line = line.rstrip('\n')
                 if not line:
                     continue
-                lvl = "info"
-                if re.search(r'error|exception|traceback', line, re.I):
-                    lvl = "error"
-                elif re.search(r'warn', line, re.I):
-                    lvl = "warn"
-                yield f"data: {json.dumps({'line': line, 'level': lvl}, ensure_ascii=False)}\n\n"
+                lvl = _log_level(line)
+                yield b"data: " + _json_dumps({'line': line, 'level': lvl}) + b"\n\n"
         except GeneratorExit:
             pass
         finally:
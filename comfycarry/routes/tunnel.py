@@ -11,7 +11,8 @@ import time as _time
 import requests as http_requests
 from flask import Blueprint, Response, jsonify, request
 
-from ..config import get_config, set_config
+from ..config import _json_dumps, get_config, set_config
+from ..utils import _pm2_jlist_invalidate, _pm2_proc
 
 bp = Blueprint("tunnel", __name__)
 
@@ -314,6 +315,7 @@ def api_tunnel_restart():
         # 公共模式: 直接 PM2 重启
         r = subprocess.run("pm2 restart cf-tunnel 2>/dev/null", shell=True,
                            capture_output=True, text=True, timeout=10)
+        _pm2_jlist_invalidate()
         if r.returncode != 0:
             return jsonify({"ok": False, "error": "PM2 重启失败"}), 500
         return jsonify({"ok": True})
@@ -342,6 +344,7 @@ def api_tunnel_stop():
     """停止 cloudflared (PM2)"""
     r = subprocess.run("pm2 stop cf-tunnel 2>/dev/null", shell=True,
                        capture_output=True, text=True, timeout=10)
+    _pm2_jlist_invalidate()
     if r.returncode != 0:
         return jsonify({"ok": False, "error": "停止失败"}), 500
     return jsonify({"ok": True})
@@ -352,6 +355,7 @@ def api_tunnel_start():
     """启动 cloudflared (PM2)"""
     r = subprocess.run("pm2 start cf-tunnel 2>/dev/null", shell=True,
                        capture_output=True, text=True, timeout=10)
+    _pm2_jlist_invalidate()
     if r.returncode != 0:
         return jsonify({"ok": False, "error": "启动失败"}), 500
     return jsonify({"ok": True})
@@ -616,6 +620,22 @@ _CF_NOISE_RE = re.compile(
     r'|request ended abruptly: context canceled',
     re.IGNORECASE,
 )
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+_PM2_PREFIX_RE = re.compile(r'^\d+\|[^|]+\|\s*', re.MULTILINE)
+
+
+def _tunnel_log_level(line):
+    """cloudflared 日志行级别.
+
+    等价于原先的 re.search(r'error|ERR|exception', re.I) / re.search(r'warn', re.I):
+    忽略大小写时 error 已被 err 覆盖, 小写一次后做子串判断即可
+    """
+    low = line.lower()
+    if "err" in low or "exception" in low:
+        return "error"
+    if "warn" in low:
+        return "warn"
+    return "info"
 
 
 @bp.route("/api/tunnel/logs")
@@ -629,9 +649,8 @@ def api_tunnel_logs():
             shell=True, capture_output=True, text=True, timeout=5
         )
         raw = r.stdout + r.stderr
-        ansi_re = re.compile(r'\x1b\[[0-9;]*m')
-        cleaned = ansi_re.sub('', raw)
-        cleaned = re.sub(r'^\d+\|[^|]+\|\s*', '', cleaned, flags=re.MULTILINE)
+        cleaned = _ANSI_RE.sub('', raw)
+        cleaned = _PM2_PREFIX_RE.sub('', cleaned)
         logs = '\n'.join(
             l for l in cleaned.split('\n')
             if not l.startswith('[TAILING]')
@@ -647,9 +666,6 @@ def api_tunnel_logs():
 @bp.route("/api/tunnel/logs/stream")
 def api_tunnel_logs_stream():
     """SSE — cloudflared 实时日志流"""
-    ansi_re = re.compile(r'\x1b\[[0-9;]*m')
-    pm2_prefix_re = re.compile(r'^\d+\|[^|]+\|\s*')
-
     def generate():
         proc = None
         try:
@@ -661,16 +677,12 @@ def api_tunnel_logs_stream():
             for line in iter(proc.stdout.readline, ''):
                 if not line:
                     break
-                line = ansi_re.sub('', line.rstrip('\n'))
-                line = pm2_prefix_re.sub('', line)
+                line = _ANSI_RE.sub('', line.rstrip('\n'))
+                line = _PM2_PREFIX_RE.sub('', line)
                 if not line or _CF_NOISE_RE.search(line):
                     continue
-                lvl = "info"
-                if re.search(r'error|ERR|exception', line, re.I):
-                    lvl = "error"
-                elif re.search(r'warn', line, re.I):
-                    lvl = "warn"
-                yield f"data: {json.dumps({'line': line, 'level': lvl}, ensure_ascii=False)}\n\n"
+                lvl = _tunnel_log_level(line)
+                yield b"data: " + _json_dumps({'line': line, 'level': lvl}) + b"\n\n"
         except GeneratorExit:
             pass
         finally:
@@ -693,16 +705,8 @@ def api_tunnel_logs_stream():
 
 def _get_cloudflared_pm2_status() -> str:
     """查询 cloudflared PM2 进程状态"""
-    try:
-        r = subprocess.run("pm2 jlist 2>/dev/null", shell=True,
-                           capture_output=True, text=True, timeout=5)
-        if r.returncode == 0:
-            for p in json.loads(r.stdout):
-                if p.get("name") == "cf-tunnel":
-                    return p.get("pm2_env", {}).get("status", "unknown")
-    except Exception:
-        pass
-    return "unknown"
+    p = _pm2_proc("cf-tunnel")
+    return p.get("pm2_env", {}).get("status", "unknown") if p else "unknown"
 
 
 
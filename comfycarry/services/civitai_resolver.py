@@ -14,21 +14,34 @@ ComfyCarry — CivitAI Resolver
 import json
 import logging
 import os
+import random
 import re
+import threading
 import time
 from pathlib import Path
 from typing import Optional
 from urllib.parse import urlparse, parse_qs
 
 import requests as http_requests
+from requests.adapters import HTTPAdapter
 
-from ..config import COMFYUI_DIR, MODEL_DIRS
+from ..config import COMFYUI_DIR, MODEL_DIRS, _json_loads
 from ..utils import _sha256_file, read_safetensors_metadata
 
 logger = logging.getLogger(__name__)
 
 _CIVITAI_API_BASE = "https://civitai.com/api/v1"
 
+# 模块级共享 Session: 复用 civitai.com 的 keep-alive 连接, 避免每次请求重新 TCP+TLS 握手
+# (routes/models.py 的 Meilisearch / CivitAI 代理也复用此 Session)
+_http_session = http_requests.Session()
+_http_session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+
+
+def get_http_session() -> http_requests.Session:
+    """共享 Session 的公开入口 (供 routes 的代理请求复用同一连接池)"""
+    return _http_session
+
 # CivitAI 模型类型 → ComfyUI MODEL_DIRS key
 _TYPE_TO_DIR_KEY = {
     "checkpoint": "checkpoints",
@@ -54,7 +67,7 @@ _TYPE_TO_DIR_KEY = {
 }
 
 # 有效模型文件扩展名
-_MODEL_EXTENSIONS = {".safetensors", ".ckpt", ".pt", ".pth", ".bin", ".gguf"}
+_MODEL_EXTENSIONS = frozenset({".safetensors", ".ckpt", ".pt", ".pth", ".bin", ".gguf"})
 
 # 分离架构 (split-file): UNet 主权重 应进 diffusion_models 而非 checkpoints。
 # §4.2 废弃盲重定向: CivitAI 整合包与 UNet 都标 "Checkpoint"、baseModel 相同,
@@ -80,6 +93,19 @@ def _is_split_file_base_model(base_model: str) -> bool:
 
 # ── URL/ID 解析 ──────────────────────────────────────────────────────────────
 
+_ID_PAIR_RE = re.compile(r"^(\d+):(\d+)$")
+
+# CivitAI URL 路径: 单个预编译模式一次匹配, 按命名分组区分
+#   /api/download/models/{vid}  /api/v1/models/{mid}
+#   [/api/v1]/model-versions/{vid}  /models/{mid}[/anything]
+_CIVITAI_PATH_RE = re.compile(
+    r"/(?:api/download/models/(?P<dl_vid>\d+)"
+    r"|api/v\d+/models/(?P<api_mid>\d+)"
+    r"|(?:api/v\d+/)?model-versions/(?P<vid>\d+)"
+    r"|models/(?P<mid>\d+))"
+)
+
+
 def parse_civitai_input(input_str: str) -> dict:
     """
     解析 CivitAI 模型输入, 支持多种格式:
@@ -108,9 +134,9 @@ def parse_civitai_input(input_str: str) -> dict:
         return {"model_id": int(text), "version_id": None}
 
     # model_id:version_id
-    if re.match(r"^\d+:\d+$", text):
-        parts = text.split(":")
-        return {"model_id": int(parts[0]), "version_id": int(parts[1])}
+    m = _ID_PAIR_RE.match(text)
+    if m:
+        return {"model_id": int(m.group(1)), "version_id": int(m.group(2))}
 
     # URL 解析
     url = text if text.startswith("http") else f"https://{text}"
@@ -126,43 +152,193 @@ def parse_civitai_input(input_str: str) -> dict:
     path = parsed.path.rstrip("/")
     query = parse_qs(parsed.query)
 
-    # /api/download/models/{version_id}
-    m = re.match(r"/api/download/models/(\d+)", path)
+    m = _CIVITAI_PATH_RE.match(path)
     if m:
-        return {"model_id": None, "version_id": int(m.group(1))}
+        if m.group("api_mid"):
+            return {"model_id": int(m.group("api_mid")), "version_id": None}
+        if m.group("mid"):
+            # /models/{model_id}: 检查 ?modelVersionId= 查询参数
+            version_id = None
+            if "modelVersionId" in query:
+                try:
+                    version_id = int(query["modelVersionId"][0])
+                except (ValueError, IndexError):
+                    pass
+            return {"model_id": int(m.group("mid")), "version_id": version_id}
+        return {"model_id": None, "version_id": int(m.group("dl_vid") or m.group("vid"))}
 
-    # /api/v1/models/{model_id}
-    m = re.match(r"/api/v\d+/models/(\d+)", path)
-    if m:
-        return {"model_id": int(m.group(1)), "version_id": None}
+    raise ValueError(f"无法从链接中提取模型 ID: {text}")
 
-    # /api/v1/model-versions/{version_id}
-    m = re.match(r"/api/v\d+/model-versions/(\d+)", path)
-    if m:
-        return {"model_id": None, "version_id": int(m.group(1))}
 
-    # /model-versions/{version_id}
-    m = re.match(r"/model-versions/(\d+)", path)
-    if m:
-        return {"model_id": None, "version_id": int(m.group(1))}
+# ── CivitAI API 调用 ────────────────────────────────────────────────────────
 
-    # /models/{model_id}[/anything]
-    m = re.match(r"/models/(\d+)", path)
-    if m:
-        model_id = int(m.group(1))
-        # 检查 ?modelVersionId= 查询参数
-        version_id = None
-        if "modelVersionId" in query:
-            try:
-                version_id = int(query["modelVersionId"][0])
-            except (ValueError, IndexError):
-                pass
-        return {"model_id": model_id, "version_id": version_id}
+_API_MAX_RETRIES = 3
+_API_RETRY_STATUS = {429, 500, 502, 503, 504}
+# 单次调用的重试总预算 (秒): 限速排队 / 退避 / Retry-After 都在 Flask 请求线程上同步等待,
+# 预计等待超出剩余预算时不再重试, 直接把最后一次结果交给调用方
+_API_RETRY_BUDGET = 20.0
 
-    raise ValueError(f"无法从链接中提取模型 ID: {text}")
 
+def _backoff(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Full-jitter 指数退避: 在 [0, min(cap, base * 2^attempt)] 内均匀取值, 避免多实例同时重试"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class _CircuitBreaker:
+    """
+    简易熔断器 (进程级, 线程安全).
+
+    closed: 正常放行; window 秒内连续失败达 threshold 次 → open.
+    open: cooldown 秒内直接快速失败, 不再打到上游.
+    half_open: 冷却结束后放行一次试探请求, 成功 → closed, 失败 → 重新 open.
+    """
+
+    def __init__(self, threshold: int = 5, window: float = 30.0, cooldown: float = 60.0):
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._failures: list[float] = []
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures.clear()
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state != "half_open":
+                self._failures = [t for t in self._failures if now - t < self.window]
+                self._failures.append(now)
+                if len(self._failures) < self.threshold:
+                    return
+            self.state = "open"
+            self._opened_at = now
+            self._failures.clear()
+            logger.warning(f"[civitai_resolver] CivitAI API 连续失败, 熔断 {self.cooldown:.0f}s")
+
+
+_api_breaker = _CircuitBreaker()
+
+
+class _TokenBucket:
+    """
+    自适应令牌桶限速 (进程级, 线程安全).
+
+    按 rps 补充令牌, acquire() 无令牌时阻塞等待 (超过 deadline 则放弃);
+    收到 429 时速率减半, 连续 20 次成功后速率 ×1.5 (不超过 max_rps).
+    """
+
+    def __init__(self, rps: float = 5.0, min_rps: float = 1.0, max_rps: float = 10.0):
+        self.rps = rps
+        self.min_rps = min_rps
+        self.max_rps = max_rps
+        self._tokens = rps
+        self._last = time.monotonic()
+        self._streak = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: float | None = None) -> bool:
+        """取一个令牌; 需要等到 deadline (monotonic) 之后才能取到时返回 False"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.rps, self._tokens + (now - self._last) * self.rps)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rps
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self._streak += 1
+            if self._streak >= 20:
+                self._streak = 0
+                self.rps = min(self.max_rps, self.rps * 1.5)
+
+    def on_throttled(self):
+        with self._lock:
+            self._streak = 0
+            self.rps = max(self.min_rps, self.rps / 2)
+
+
+_api_bucket = _TokenBucket()
+
+
+def _retry_after(r: http_requests.Response, cap: float = 60.0) -> float | None:
+    """解析 Retry-After 响应头 (仅支持秒数形式)"""
+    try:
+        return min(cap, max(0.0, float(r.headers.get("Retry-After", ""))))
+    except ValueError:
+        return None
+
+
+def _api_get(url: str, headers: dict, timeout: float = 30) -> http_requests.Response:
+    """
+    GET CivitAI API, 对连接错误 / 超时 / 429 / 5xx 做 full-jitter 退避重试.
+
+    重试耗尽, 或下一次等待 (退避 / Retry-After) 会超出 _API_RETRY_BUDGET 时,
+    返回最后一次响应 (或抛出最后一次异常), 由调用方按原逻辑处理.
+    熔断打开 / 限速排队超出预算时直接抛出 ConnectionError, 不发起请求.
+    """
+    deadline = time.monotonic() + _API_RETRY_BUDGET
+    for attempt in range(_API_MAX_RETRIES + 1):
+        if not _api_breaker.allow():
+            raise http_requests.ConnectionError("CivitAI API 连续失败, 已暂时熔断, 请稍后重试")
+        if not _api_bucket.acquire(deadline):
+            raise http_requests.ConnectionError("CivitAI API 请求排队超时, 请稍后重试")
+        # 首次请求用完整超时, 重试只用剩余预算
+        attempt_timeout = timeout if attempt == 0 else max(1.0, min(timeout, deadline - time.monotonic()))
+        r = error = delay = None
+        try:
+            r = _http_session.get(url, headers=headers, timeout=attempt_timeout)
+        except http_requests.RequestException as e:
+            _api_breaker.record_failure()
+            retryable = isinstance(e, (http_requests.ConnectionError, http_requests.Timeout))
+            if not retryable or attempt >= _API_MAX_RETRIES:
+                raise
+            error = e
+        else:
+            if r.status_code not in _API_RETRY_STATUS:
+                _api_breaker.record_success()
+                _api_bucket.on_success()
+                return r
+            _api_breaker.record_failure()
+            if r.status_code == 429:
+                _api_bucket.on_throttled()
+                delay = _retry_after(r)
+            if attempt >= _API_MAX_RETRIES:
+                return r
+        if delay is None:
+            delay = _backoff(attempt)
+        if time.monotonic() + delay > deadline:
+            # 剩余预算等不到下一次重试 (如 Retry-After 过长): 快速失败
+            if error is not None:
+                raise error
+            return r
+        time.sleep(delay)
+
+
+def civitai_api_get(url: str, headers: dict, timeout: float = 30) -> http_requests.Response:
+    """_api_get 的公开入口: 其他模块回源 CivitAI API 时同样经过熔断 / 限速 / 退避重试"""
+    return _api_get(url, headers, timeout)
 
-# ── CivitAI API 调用 ────────────────────────────────────────────────────────
 
 def fetch_model_info(
     model_id: int | None = None,
@@ -206,12 +382,12 @@ def fetch_model_info(
     if version_id:
         api_url = f"{_CIVITAI_API_BASE}/model-versions/{version_id}"
         try:
-            r = http_requests.get(api_url, headers=headers, timeout=30)
+            r = _api_get(api_url, headers)
             if r.status_code == 404:
                 raise RuntimeError(f"CivitAI 版本 {version_id} 不存在")
             r.raise_for_status()
-            version_data = r.json()
-        except http_requests.RequestException as e:
+            version_data = _json_loads(r.content)
+        except (http_requests.RequestException, ValueError) as e:
             raise RuntimeError(f"CivitAI API 请求失败: {e}")
 
         return _parse_version_response(version_data, api_key)
@@ -219,12 +395,12 @@ def fetch_model_info(
     # 只有 model_id: 获取模型信息, 取最新版本
     api_url = f"{_CIVITAI_API_BASE}/models/{model_id}"
     try:
-        r = http_requests.get(api_url, headers=headers, timeout=30)
+        r = _api_get(api_url, headers)
         if r.status_code == 404:
             raise RuntimeError(f"CivitAI 模型 {model_id} 不存在")
         r.raise_for_status()
-        model_data = r.json()
-    except http_requests.RequestException as e:
+        model_data = _json_loads(r.content)
+    except (http_requests.RequestException, ValueError) as e:
         raise RuntimeError(f"CivitAI API 请求失败: {e}")
 
     versions = model_data.get("modelVersions", [])
@@ -815,12 +991,12 @@ def enrich_model_by_hash(model_path: str, api_key: str = "") -> str | None:
 
     try:
         url = f"{_CIVITAI_API_BASE}/model-versions/by-hash/{sha256}"
-        resp = http_requests.get(url, headers=headers, timeout=30)
+        resp = _api_get(url, headers)
         if resp.status_code == 404:
             logger.info(f"[civitai_resolver] enrich: CivitAI 未找到 {sha256[:16]}...")
             return None
         resp.raise_for_status()
-        version_data = resp.json()
+        version_data = _json_loads(resp.content)
     except Exception as e:
         logger.warning(f"[civitai_resolver] enrich: API 失败 {e}")
         return None
@@ -865,7 +1041,7 @@ def download_preview_image(model_path: str, images: list[dict]) -> str | None:
 
     base_no_ext = Path(model_path).with_suffix("")
     try:
-        with http_requests.get(img_url, timeout=15, stream=True) as r:
+        with _http_session.get(img_url, timeout=15, stream=True) as r:
             r.raise_for_status()
             ct = r.headers.get("Content-Type", "")
             if "video" in ct:
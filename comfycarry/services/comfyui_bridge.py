@@ -22,11 +22,25 @@ import uuid
 
 import requests
 import websocket  # websocket-client
+from requests.adapters import HTTPAdapter
 
 from ..config import COMFYUI_URL
 
 logger = logging.getLogger(__name__)
 
+# 本机 ComfyUI HTTP 调用共用的 keep-alive Session (Bridge 轮询 / comfyui 与 generate 路由),
+# 复用连接池, 不再每次请求新建 TCP 连接
+_comfyui_session = requests.Session()
+_comfyui_session.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=0))
+
+# ── SSE 订阅者背压 ──
+# 每个订阅者的队列上限; 浏览器消费跟不上时内存有界
+_SUB_QUEUE_MAX = 256
+# 队列满时可直接丢弃的事件 (下一帧会覆盖), 其余事件丢了会让前端状态错乱
+_LOSSY_EVENT_TYPES = frozenset({"progress", "monitor"})
+# 连续丢弃超过此数视为慢客户端, 断开让其重连 (重连时 subscribe 会补发完整快照)
+_SUB_MAX_DROPS = 64
+
 
 class ComfyWSBridge:
     """Maintains a WebSocket connection to ComfyUI and broadcasts events via SSE."""
@@ -36,6 +50,7 @@ class ComfyWSBridge:
         self._http_url = comfyui_url.rstrip("/")
         self._client_id = str(uuid.uuid4())
         self._subscribers = {}   # id -> queue.Queue
+        self._sub_drops = {}     # id -> 连续丢弃的事件数 (仅队列满时出现)
         self._lock = threading.Lock()
         self._ws = None
         self._running = False
@@ -97,7 +112,7 @@ class ComfyWSBridge:
     def _fetch_node_names(self, prompt_id):
         """从 ComfyUI /queue 获取节点 ID → class_type 映射"""
         try:
-            r = requests.get(f"{self._http_url}/queue", timeout=3)
+            r = _comfyui_session.get(f"{self._http_url}/queue", timeout=3)
             if r.ok:
                 data = r.json()
                 # queue_running: [[number, prompt_id, {prompt}, extra_data, ...], ...]
@@ -289,7 +304,7 @@ class ComfyWSBridge:
     def subscribe(self):
         """Add a new SSE subscriber and return (sub_id, queue)."""
         sub_id = str(uuid.uuid4())
-        q = queue.Queue(maxsize=200)
+        q = queue.Queue(maxsize=_SUB_QUEUE_MAX)
         with self._lock:
             self._subscribers[sub_id] = q
             # 在锁内复制快照 — 防止 WS 线程 (_on_close) 并发清空 _exec_info
@@ -302,7 +317,7 @@ class ComfyWSBridge:
         if snap_exec:
             # 验证执行是否真的还在跑（防止陈旧快照）
             try:
-                r = requests.get(f"{self._http_url}/queue", timeout=3)
+                r = _comfyui_session.get(f"{self._http_url}/queue", timeout=3)
                 if r.ok:
                     data = r.json()
                     running_ids = {
@@ -337,17 +352,40 @@ class ComfyWSBridge:
     def unsubscribe(self, sub_id):
         with self._lock:
             self._subscribers.pop(sub_id, None)
+            self._sub_drops.pop(sub_id, None)
 
     def _broadcast(self, event):
+        lossy = event.get("type") in _LOSSY_EVENT_TYPES
         with self._lock:
             dead = []
             for sid, q in self._subscribers.items():
                 try:
                     q.put_nowait(event)
                 except queue.Full:
+                    if lossy:
+                        drops = self._sub_drops.get(sid, 0) + 1
+                        self._sub_drops[sid] = drops
+                        if drops <= _SUB_MAX_DROPS:
+                            continue
                     dead.append(sid)
+                else:
+                    if self._sub_drops:
+                        self._sub_drops.pop(sid, None)
             for sid in dead:
-                self._subscribers.pop(sid, None)
+                self._close_subscriber(sid)
+
+    def _close_subscriber(self, sub_id):
+        """移除订阅者并清空其队列, 放入 None 通知 SSE 生成器结束 (客户端随后自动重连); 调用方须持有 _lock"""
+        q = self._subscribers.pop(sub_id, None)
+        self._sub_drops.pop(sub_id, None)
+        if q is None:
+            return
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+        q.put_nowait(None)
 
 
 # ── 全局单例 ─────────────────────────────────────────────────
@@ -9,6 +9,7 @@ import logging
 import os
 import re
 import subprocess
+from functools import lru_cache
 from pathlib import Path
 
 from ..config import COMFYUI_DIR
@@ -212,8 +213,9 @@ def _install_requirements():
         log.warning("pip install timed out after 300s")
 
 
+@lru_cache(maxsize=1)
 def _detect_python_bin() -> str:
-    """检测可用的 Python 解释器"""
+    """检测可用的 Python 解释器 (结果缓存: 每个候选都要起一次子进程)"""
     for candidate in ("python3.12", "python3.11", "python3", "python"):
         try:
             subprocess.run([candidate, "--version"], capture_output=True, timeout=5)
@@ -14,16 +14,18 @@ import subprocess
 import threading
 import time
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
 DEPLOY_LOG_FILE = "/workspace/deploy.log"
 
 from ..config import (
-    COMFYUI_DIR, CONFIG_FILE, DEFAULT_PLUGINS,
-    SYNC_RULE_TEMPLATES,
+    COMFYUI_DIR, DEFAULT_PLUGINS,
+    SYNC_RULE_TEMPLATES_BY_ID,
     _load_setup_state, _save_setup_state,
     _save_dashboard_password,
 )
+from ..utils import _pm2_jlist_invalidate, _pm2_proc, _save_api_key
 from .sync_engine import (
     _load_sync_rules, _save_sync_rules, _run_sync_rule,
     start_sync_worker,
@@ -50,19 +52,8 @@ def get_deploy_log_slice(start):
 
 def _is_cf_tunnel_online() -> bool:
     """检查 cf-tunnel PM2 进程是否在线"""
-    try:
-        r = subprocess.run(
-            "pm2 jlist 2>/dev/null", shell=True,
-            capture_output=True, text=True, timeout=5
-        )
-        if r.returncode == 0:
-            import json as _json
-            for p in _json.loads(r.stdout):
-                if p.get("name") == "cf-tunnel":
-                    return p.get("pm2_env", {}).get("status") == "online"
-    except Exception:
-        pass
-    return False
+    p = _pm2_proc("cf-tunnel")
+    return bool(p) and p.get("pm2_env", {}).get("status") == "online"
 
 
 def _detect_image_type():
@@ -84,8 +75,12 @@ def _read_prebuilt_info():
     return None
 
 
+@lru_cache(maxsize=1)
 def _detect_python():
-    """动态检测可用的 Python (优先 3.12, wheel 在 3.12 上编译验证)"""
+    """动态检测可用的 Python (优先 3.12, wheel 在 3.12 上编译验证).
+
+    解释器在运行期间不会变化 (部署流程不安装 Python), 首次检测后缓存, 不再逐个 which 扫描 PATH
+    """
     for cmd in ["python3.12", "python3", "python"]:
         if shutil.which(cmd):
             return cmd
@@ -193,12 +188,12 @@ def _deploy_exec(cmd, timeout=600, label=""):
             cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
             text=True, bufsize=1
         )
-        deadline = time.time() + timeout
+        deadline = time.monotonic() + timeout
         sel = selectors.DefaultSelector()
         sel.register(proc.stdout, selectors.EVENT_READ)
         timed_out = False
         while True:
-            remaining = deadline - time.time()
+            remaining = deadline - time.monotonic()
             if remaining <= 0:
                 timed_out = True
                 break
@@ -560,6 +555,7 @@ def _step_install_comfyui(PY):
         "sleep 1",
         label="清理端口 8188"
     )
+    _pm2_jlist_invalidate()
 
     _deploy_log("启动健康检查...")
     _deploy_exec(
@@ -702,11 +698,10 @@ def _step_sync_assets(config):
     if not rules and not config.get("_imported_sync_rules"):
         wizard_sync_rules = config.get("wizard_sync_rules", [])
         if wizard_sync_rules:
-            tpl_map = {t["id"]: t for t in SYNC_RULE_TEMPLATES}
             new_rules = []
             for wr in wizard_sync_rules:
                 tpl_id = wr.get("template_id", "")
-                tpl = tpl_map.get(tpl_id)
+                tpl = SYNC_RULE_TEMPLATES_BY_ID.get(tpl_id)
                 if not tpl:
                     continue
                 rule = {
@@ -761,7 +756,7 @@ def _step_start_services(config, cfg, PY):
 
     civitai_token = config.get("civitai_token", "")
     if civitai_token:
-        CONFIG_FILE.write_text(json.dumps({"api_key": civitai_token}))
+        _save_api_key(civitai_token)
         _deploy_log("CivitAI API Key 已保存")
 
     _deploy_log("启动 ComfyUI 主服务...")
@@ -807,6 +802,7 @@ def _step_start_services(config, cfg, PY):
         f'--restart-delay 3000 --max-restarts 10 '
         f'-- main.py {comfy_args}'
     )
+    _pm2_jlist_invalidate()
 
     _deploy_exec("pm2 save 2>/dev/null || true")
 
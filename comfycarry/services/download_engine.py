@@ -25,6 +25,7 @@ from pathlib import Path
 from typing import Callable, Optional
 
 import requests as http_requests  # 避免与 flask.request 冲突
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +40,10 @@ _ARIA2_CONNECTIONS = 16     # 每个任务的连接数 (-x)
 _ARIA2_SPLIT = 16           # 分片数 (-s)
 _ARIA2_MAX_CONCURRENT = 5   # 最大并发下载数
 
-# 进度轮询间隔 (秒)
+# 进度轮询间隔 (秒): 有下载进行时固定 _POLL_INTERVAL;
+# 空闲 (无任务 / 仅暂停任务) 时指数放宽到 _POLL_IDLE_MAX, 新任务提交或恢复时立即唤醒
 _POLL_INTERVAL = 1.0
+_POLL_IDLE_MAX = 30.0
 
 
 class DownloadStatus(str, Enum):
@@ -53,6 +56,10 @@ class DownloadStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+# 未结束的任务状态 (去重 / 文件检查 / 轮询使用)
+_LIVE_STATUSES = frozenset({DownloadStatus.QUEUED, DownloadStatus.ACTIVE, DownloadStatus.PAUSED})
+
+
 @dataclass
 class DownloadTask:
     """下载任务元数据"""
@@ -86,11 +93,18 @@ class DownloadEngine:
 
     def __init__(self):
         self._tasks: dict[str, DownloadTask] = {}  # download_id → task
+        # (save_dir, filename) → 该路径最近提交的 download_id
+        # submit 去重保证同一路径至多一个未结束任务, 且必为最近提交的那个
+        self._path_index: dict[tuple[str, str], str] = {}
+        # 尚未结束的任务 id — 轮询只遍历这里, 不扫描全部历史任务 (含启动时从 DB 恢复的终态记录)
+        self._pending_ids: set[str] = set()
         self._lock = threading.Lock()
         self._aria2_proc: subprocess.Popen | None = None
         self._poller_thread: threading.Thread | None = None
         self._running = False
+        self._poll_wake = threading.Event()
         self._rpc_id = 0
+        self._rpc_session: http_requests.Session | None = None
         # 状态变化回调: callback(task, old_status, new_status)
         self._on_status_change: list[Callable] = []
         # 进度更新回调: callback(task) — 每次 poll 有进度变化时调用
@@ -114,6 +128,7 @@ class DownloadEngine:
     def stop(self):
         """关闭引擎"""
         self._running = False
+        self._poll_wake.set()
         if self._aria2_proc:
             try:
                 self._rpc_call("aria2.shutdown")
@@ -190,6 +205,19 @@ class DownloadEngine:
 
     # ── JSON-RPC 通信 ────────────────────────────────────────────────────────
 
+    def _get_rpc_session(self) -> http_requests.Session:
+        """
+        惰性创建 RPC 专用 Session: 复用到 aria2c 的 keep-alive 连接.
+
+        poll 线程 + 多个 Flask 请求线程会并发调用 RPC, 默认连接池 (10) 不够时
+        urllib3 会丢弃连接; 这里放大池容量, 并关闭 urllib3 自身重试 (本地 RPC 失败即返回).
+        """
+        if self._rpc_session is None:
+            session = http_requests.Session()
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=32, max_retries=0))
+            self._rpc_session = session
+        return self._rpc_session
+
     def _rpc_call(self, method: str, params: list | None = None) -> dict:
         """发送 JSON-RPC 2.0 请求"""
         self._rpc_id += 1
@@ -199,7 +227,7 @@ class DownloadEngine:
             "method": method,
             "params": [f"token:{_RPC_SECRET}"] + (params or []),
         }
-        resp = http_requests.post(_RPC_URL, json=payload, timeout=5)
+        resp = self._get_rpc_session().post(_RPC_URL, json=payload, timeout=5)
         data = resp.json()
         if "error" in data:
             raise RuntimeError(f"aria2 RPC error: {data['error']}")
@@ -238,19 +266,13 @@ class DownloadEngine:
         # ── 原子操作: 去重 + 文件检查 + RPC + 写入, 全部在单个 lock 内 ──
         with self._lock:
             # 去重：同 filename+save_dir 的活跃/排队/暂停任务
-            for existing in self._tasks.values():
-                if (existing.filename == filename
-                        and existing.save_dir == save_dir
-                        and existing.status in (
-                            DownloadStatus.ACTIVE,
-                            DownloadStatus.QUEUED,
-                            DownloadStatus.PAUSED,
-                        )):
-                    logger.info(
-                        f"[download_engine] 跳过重复下载: {filename} "
-                        f"(已有任务 {existing.download_id})"
-                    )
-                    return existing
+            existing = self._live_task_at(save_dir, filename)
+            if existing:
+                logger.info(
+                    f"[download_engine] 跳过重复下载: {filename} "
+                    f"(已有任务 {existing.download_id})"
+                )
+                return existing
 
             # 检查文件是否已存在且完整 (非空 + 无 .aria2 控制文件)
             dest = os.path.join(save_dir, filename)
@@ -323,6 +345,9 @@ class DownloadEngine:
                     logger.error(f"[download_engine] 提交下载失败: {e}")
 
                 self._tasks[download_id] = task
+                self._path_index[(save_dir, filename)] = download_id
+                if task.status in _LIVE_STATUSES:
+                    self._pending_ids.add(download_id)
                 return_task = task
 
         # 回调在 lock 外触发
@@ -330,6 +355,7 @@ class DownloadEngine:
             self._fire_on_complete(return_task)
 
         if not fire_existed:
+            self._poll_wake.set()
             logger.info(
                 f"[download_engine] 提交下载 {download_id}: "
                 f"{filename} → {save_dir}"
@@ -342,11 +368,7 @@ class DownloadEngine:
             task = self._tasks.get(download_id)
             if not task:
                 return False
-            if task.status not in (
-                DownloadStatus.QUEUED,
-                DownloadStatus.ACTIVE,
-                DownloadStatus.PAUSED,
-            ):
+            if task.status not in _LIVE_STATUSES:
                 return False
             was_paused = task.status == DownloadStatus.PAUSED
             gid = task.gid
@@ -367,7 +389,7 @@ class DownloadEngine:
 
         with self._lock:
             # 仅在任务仍处于可取消状态时标记 — 防止覆盖 poll 线程已设置的终态
-            if task.status in (DownloadStatus.QUEUED, DownloadStatus.ACTIVE, DownloadStatus.PAUSED):
+            if task.status in _LIVE_STATUSES:
                 old_status = task.status
                 task.status = DownloadStatus.CANCELLED
                 task.completed_at = time.time()
@@ -430,6 +452,7 @@ class DownloadEngine:
             old_status = task.status
             task.status = DownloadStatus.ACTIVE
 
+        self._poll_wake.set()
         self._fire_status_change(task, old_status, DownloadStatus.ACTIVE)
         logger.info(f"[download_engine] 已恢复 {download_id}")
         return True
@@ -453,15 +476,10 @@ class DownloadEngine:
         file_exists = os.path.isfile(dest) and os.path.getsize(dest) > 0
         aria2_partial = os.path.isfile(dest + ".aria2")
 
-        downloading = False
-        active_id = None
         with self._lock:
-            for task in self._tasks.values():
-                if (task.save_dir == save_dir and task.filename == filename
-                        and task.status in (DownloadStatus.QUEUED, DownloadStatus.ACTIVE, DownloadStatus.PAUSED)):
-                    downloading = True
-                    active_id = task.download_id
-                    break
+            live = self._live_task_at(save_dir, filename)
+        downloading = live is not None
+        active_id = live.download_id if live else None
 
         # 文件存在 + 无活跃下载 + 无 .aria2 控制文件 = 已安装
         installed = file_exists and not downloading and not aria2_partial
@@ -492,40 +510,60 @@ class DownloadEngine:
         with self._lock:
             to_remove = [
                 did for did, t in self._tasks.items()
-                if t.status in (
-                    DownloadStatus.COMPLETE,
-                    DownloadStatus.FAILED,
-                    DownloadStatus.CANCELLED,
-                )
+                if t.status not in _LIVE_STATUSES
             ]
             for did in to_remove:
-                del self._tasks[did]
+                self._drop_task(did)
         return len(to_remove)
 
     def clear_task(self, download_id: str):
         """移除单个任务记录"""
         with self._lock:
-            self._tasks.pop(download_id, None)
+            self._drop_task(download_id)
+
+    def _live_task_at(self, save_dir: str, filename: str) -> DownloadTask | None:
+        """O(1) 查找指定路径上未结束的任务 (调用方需持有 self._lock)"""
+        did = self._path_index.get((save_dir, filename))
+        task = self._tasks.get(did) if did else None
+        if task and task.status in _LIVE_STATUSES:
+            return task
+        return None
+
+    def _drop_task(self, download_id: str):
+        """移除任务及其路径索引 (调用方需持有 self._lock)"""
+        task = self._tasks.pop(download_id, None)
+        self._pending_ids.discard(download_id)
+        if task:
+            key = (task.save_dir, task.filename)
+            if self._path_index.get(key) == download_id:
+                del self._path_index[key]
 
     # ── 状态轮询 ─────────────────────────────────────────────────────────────
 
     def _poll_loop(self):
-        """后台线程: 定期轮询 aria2c 状态并更新任务"""
+        """后台线程: 轮询 aria2c 状态并更新任务 (空闲时自适应放宽间隔)"""
+        interval = _POLL_INTERVAL
         while self._running:
+            # 先清再同步: 同步期间 / 之后的 set() 都会让下一次 wait 立即返回, 不丢唤醒
+            self._poll_wake.clear()
+            busy = True
             try:
-                self._sync_all_tasks()
+                busy = self._sync_all_tasks()
             except Exception as e:
                 logger.debug(f"[download_engine] 轮询异常: {e}")
-            time.sleep(_POLL_INTERVAL)
+            interval = _POLL_INTERVAL if busy else min(interval * 2, _POLL_IDLE_MAX)
+            self._poll_wake.wait(interval)
 
-    def _sync_all_tasks(self):
-        """同步所有活跃/排队任务的状态"""
+    def _sync_all_tasks(self) -> bool:
+        """同步所有活跃/排队/暂停任务的状态. 返回是否仍有进行中 (活跃/排队) 的下载"""
         with self._lock:
-            active_tasks = [
-                t for t in self._tasks.values()
-                if t.status in (DownloadStatus.QUEUED, DownloadStatus.ACTIVE, DownloadStatus.PAUSED)
-                and t.gid
-            ]
+            active_tasks = []
+            for did in list(self._pending_ids):
+                t = self._tasks.get(did)
+                if t is None or t.status not in _LIVE_STATUSES:
+                    self._pending_ids.discard(did)  # 已结束: 移出待轮询集合
+                elif t.gid:
+                    active_tasks.append(t)
 
         for task in active_tasks:
             try:
@@ -556,6 +594,11 @@ class DownloadEngine:
                         self._fire_status_change(task, old_status, DownloadStatus.COMPLETE)
                         self._fire_on_complete(task)
 
+        return any(
+            t.status in (DownloadStatus.QUEUED, DownloadStatus.ACTIVE)
+            for t in active_tasks
+        )
+
     def _fire_on_complete(self, task: DownloadTask):
         """安全地触发完成回调"""
         if task.on_complete:
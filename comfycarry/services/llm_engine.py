@@ -657,13 +657,13 @@ def test_connection(provider_id: str, api_key: str, model: str, base_url: str =
         {"role": "user", "content": "Say 'ok' in one word."}
     ]
 
-    start = time.time()
+    start = time.monotonic()
     try:
         text = provider.chat(messages, max_tokens=10)
-        latency = int((time.time() - start) * 1000)
+        latency = int((time.monotonic() - start) * 1000)
         return {"ok": True, "model": model, "latency_ms": latency, "response": text.strip()}
     except Exception as e:
-        latency = int((time.time() - start) * 1000)
+        latency = int((time.monotonic() - start) * 1000)
         return {"ok": False, "model": model, "latency_ms": latency, "error": str(e)}
 
 
@@ -7,7 +7,6 @@ public_tunnel_state 字段，重启后可通过 restore() 恢复。
 
 import hmac
 import hashlib
-import json
 import logging
 import os
 import shlex
@@ -20,6 +19,7 @@ from typing import Optional
 import requests
 
 from ..config import get_config, set_config
+from ..utils import _pm2_jlist_invalidate, _pm2_proc
 
 log = logging.getLogger(__name__)
 
@@ -340,6 +340,7 @@ class PublicTunnelClient:
                 f'--metrics localhost:20241 run --token {shlex.quote(token)}',
                 shell=True, capture_output=True, text=True, timeout=15,
             )
+            _pm2_jlist_invalidate()
             log.info(f"cloudflared (cf-tunnel) 已通过 PM2 启动 (protocol={protocol})")
         except Exception as e:
             log.error(f"启动 cloudflared 失败: {e}")
@@ -353,21 +354,12 @@ class PublicTunnelClient:
             )
         except Exception:
             pass
+        _pm2_jlist_invalidate()
 
     def _is_cloudflared_running(self) -> bool:
         """检查 cloudflared PM2 进程是否在运行"""
-        try:
-            r = subprocess.run(
-                "pm2 jlist 2>/dev/null",
-                shell=True, capture_output=True, text=True, timeout=5,
-            )
-            if r.returncode == 0:
-                for p in json.loads(r.stdout):
-                    if p.get("name") == "cf-tunnel":
-                        return p.get("pm2_env", {}).get("status") == "online"
-        except Exception:
-            pass
-        return False
+        p = _pm2_proc("cf-tunnel")
+        return bool(p) and p.get("pm2_env", {}).get("status") == "online"
 
 
 
@@ -16,6 +16,8 @@ from typing import Dict, List, Optional, Tuple
 
 import requests
 
+from ..utils import _pm2_jlist_invalidate
+
 log = logging.getLogger(__name__)
 
 CF_API_BASE = "https://api.cloudflare.com/client/v4"
@@ -185,6 +187,7 @@ class TunnelManager:
 
             # 1. 停止 cloudflared
             subprocess.run("pm2 delete cf-tunnel 2>/dev/null", shell=True)
+            _pm2_jlist_invalidate()
 
             # 2. 删除 DNS 记录 (查找所有指向该 tunnel 的 CNAME)
             tunnel_cname = f"{tunnel_id}.cfargotunnel.com"
@@ -275,6 +278,7 @@ class TunnelManager:
             f'--metrics localhost:20241 run --token {shlex.quote(tunnel_token)}',
             shell=True, capture_output=True, text=True
         )
+        _pm2_jlist_invalidate()
         subprocess.run("pm2 save 2>/dev/null", shell=True)
         return r.returncode == 0
 
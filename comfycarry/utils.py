@@ -4,20 +4,49 @@ ComfyCarry — 通用工具函数
 
 import hashlib
 import json
+import os
+import shlex
 import struct
 import subprocess
+import threading
+import time
 
-from .config import CONFIG_FILE
+from .config import COMFYUI_DIR, CONFIG_FILE, _atomic_write_bytes, _json_dumps, _json_loads
+
+
+# CivitAI API Key 缓存: 按 (mtime_ns, size) 失效, 命中时只需一次 stat
+# (配置文件有多处写入方: 设置页 / 导入 / 部署 / 启动时导入环境变量, 统一靠文件签名感知变化)
+_api_key_cache: str | None = None
+_api_key_sig: tuple | None = None
+_api_key_lock = threading.Lock()
 
 
 def _get_api_key():
     """获取 CivitAI API Key"""
-    if CONFIG_FILE.exists():
-        try:
-            return json.loads(CONFIG_FILE.read_text()).get("api_key", "")
-        except Exception:
-            return ""
-    return ""
+    global _api_key_cache, _api_key_sig
+    try:
+        st = CONFIG_FILE.stat()
+    except OSError:
+        return ""
+    sig = (st.st_mtime_ns, st.st_size)
+
+    with _api_key_lock:
+        if _api_key_cache is not None and sig == _api_key_sig:
+            return _api_key_cache
+
+    try:
+        key = json.loads(CONFIG_FILE.read_text()).get("api_key", "")
+    except Exception:
+        return ""
+
+    with _api_key_lock:
+        _api_key_cache, _api_key_sig = key, sig
+    return key
+
+
+def _save_api_key(key: str):
+    """保存 CivitAI API Key (原子写入, 读取方不会看到半截 JSON)"""
+    _atomic_write_bytes(CONFIG_FILE, _json_dumps({"api_key": key}))
 
 
 def _run_cmd(cmd, timeout=10):
@@ -29,6 +58,98 @@ def _run_cmd(cmd, timeout=10):
         return f"Error: {e}"
 
 
+# ── pm2 进程列表缓存 ──
+# 多个页面按秒轮询 status/params, 每次 pm2 jlist 都要起一个 node 进程;
+# 短 TTL 内复用同一次结果, 并发轮询合并为至多每秒一次
+_PM2_JLIST_TTL = 1.0
+# (monotonic 时间戳, 进程列表 tuple, name → 进程 dict) — 整体赋值发布, 读路径不加锁
+_pm2_jlist_cache: tuple[float, tuple, dict] = (float("-inf"), (), {})
+_pm2_jlist_lock = threading.Lock()
+
+
+def _pm2_jlist_snapshot(max_age):
+    """(进程列表, 按名称索引) — 缓存过期时重新查询"""
+    global _pm2_jlist_cache
+    snap = _pm2_jlist_cache
+    if time.monotonic() - snap[0] < max_age:
+        return snap
+    with _pm2_jlist_lock:
+        snap = _pm2_jlist_cache
+        if time.monotonic() - snap[0] < max_age:  # 等锁期间已被其他线程刷新
+            return snap
+        try:
+            r = subprocess.run(["pm2", "jlist"], stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, timeout=5)
+            procs = tuple(_json_loads(r.stdout or b"[]"))
+        except Exception:
+            procs = ()
+        by_name = {}
+        for p in procs:
+            by_name.setdefault(p.get("name"), p)  # 同名取第一个, 与线性查找一致
+        snap = _pm2_jlist_cache = (time.monotonic(), procs, by_name)
+        return snap
+
+
+def _pm2_jlist(max_age=_PM2_JLIST_TTL):
+    """pm2 进程列表 (共享只读 tuple, 查询失败时为空)"""
+    return _pm2_jlist_snapshot(max_age)[1]
+
+
+def _pm2_proc(name, max_age=_PM2_JLIST_TTL):
+    """按名称取 pm2 进程 (共享只读 dict, 不存在时 None)"""
+    return _pm2_jlist_snapshot(max_age)[2].get(name)
+
+
+def _pm2_start_comfyui(py, args_str, check=False):
+    """pm2 启动 ComfyUI: argv 直接 exec, 用 cwd 代替 `cd &&`, 不经 /bin/sh"""
+    return subprocess.run(
+        ["pm2", "start", py, "--name", "comfy",
+         "--interpreter", "none", "--log", "/workspace/comfy.log", "--time",
+         "--restart-delay", "3000", "--max-restarts", "10",
+         "--", "main.py", *shlex.split(args_str)],
+        cwd=COMFYUI_DIR, timeout=30, check=check,
+    )
+
+
+def _pm2_jlist_invalidate():
+    """pm2 start / delete / restart 之后调用, 下次读取必定重新查询"""
+    global _pm2_jlist_cache
+    _pm2_jlist_cache = (float("-inf"), (), {})
+
+
+def _log_level(line):
+    """日志行级别 (error / warn / info).
+
+    小写一次后做定长子串匹配 (C 层 memmem), 比每行两次 re.search(..., re.I) 快, 结果相同
+    """
+    low = line.lower()
+    if "error" in low or "exception" in low or "traceback" in low:
+        return "error"
+    if "warn" in low:
+        return "warn"
+    return "info"
+
+
+def _tail_lines(path, n, block=65536):
+    """读取文件最后 n 行 (从文件末尾按块向前读, 不起 tail 子进程; 文件不存在时抛 OSError)"""
+    if n <= 0:  # splitlines()[-0:] 会返回整块, 需单独处理
+        return ""
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        chunks = []
+        newlines = 0
+        # 多读一个换行, 保证最早那一行是完整的
+        while pos > 0 and newlines <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            chunks.append(chunk)
+            newlines += chunk.count(b"\n")
+    data = b"".join(reversed(chunks))
+    return b"\n".join(data.splitlines()[-n:]).decode("utf-8", "replace")
+
+
 def _sha256_file(filepath):
     """计算文件完整 SHA256 (CivitAI 需要完整文件哈希)"""
     sha = hashlib.sha256()
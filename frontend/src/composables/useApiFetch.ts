@@ -1,6 +1,9 @@
 import { ref } from 'vue'
 import { useToast } from './useToast'
 
+/** Default request headers — shared and frozen, not rebuilt for every call */
+const JSON_HEADERS: HeadersInit = Object.freeze({ 'Content-Type': 'application/json' })
+
 let _redirecting = false
 function redirectToLogin() {
   if (_redirecting) return
@@ -24,10 +27,8 @@ export function useApiFetch() {
     loading.value = true
     error.value = null
     try {
-      const res = await fetch(url, {
-        headers: { 'Content-Type': 'application/json', ...opts.headers as Record<string, string> },
-        ...opts,
-      })
+      // Caller-supplied headers replace the defaults (opts is spread last)
+      const res = await fetch(url, { headers: JSON_HEADERS, ...opts })
       if (!res.ok) {
         // 401: session expired — redirect to login
         if (res.status === 401) {
@@ -1,5 +1,7 @@
 import { ref, computed, watch, type Ref } from 'vue'
 import { useApiFetch } from './useApiFetch'
+import { mapLimit, sleep } from '@/utils/async'
+import { CIVITAI_IMAGE_CDN } from '@/utils/constants'
 
 // ── Types ──────────────────────────────────────────────
 
@@ -54,6 +56,20 @@ export type SortKey = 'Relevancy' | 'Most Downloaded' | 'Highest Rated' | 'Newes
 // ── Constants ──────────────────────────────────────────
 
 const PAGE_SIZE = 20
+/** Max in-flight requests for ID/URL lookups */
+const LOOKUP_CONCURRENCY = 6
+/** Model IDs per list-endpoint request (CivitAI /models?ids=) */
+const LOOKUP_BATCH_SIZE = 20
+/** Retries per request when the proxy reports throttling (429/503) */
+const LOOKUP_MAX_RETRIES = 3
+/** Upper bound for a server-provided Retry-After wait */
+const RETRY_AFTER_MAX_MS = 30_000
+/** Start pacing requests once X-RateLimit-Remaining drops below this */
+const RATE_LIMIT_LOW_WATER = 3
+/** Raw API models kept for repeat ID lookups (LRU) */
+const MODEL_CACHE_MAX = 200
+/** Matches the backend's model-detail cache TTL */
+const MODEL_CACHE_TTL_MS = 10 * 60_000
 
 const SORT_MAP: Record<SortKey, string[]> = {
   'Relevancy': [],
@@ -79,18 +95,23 @@ const ATTRIBUTES_TO_RETRIEVE = [
 
 // ── Helpers ────────────────────────────────────────────
 
+const QUERY_SPLIT_RE = /[,\s\n]+/
+const NUMERIC_ID_RE = /^\d+$/
+/** CivitAI model URL with optional ?modelVersionId= — one pass extracts both IDs */
+const CIVITAI_MODEL_URL_RE = /civitai\.com\/models\/(\d+)(?:.*[?&]modelVersionId=(\d+))?/
+
 /** Check if every part of the query is a numeric ID or CivitAI URL */
 function isIdQuery(text: string): boolean {
-  const parts = text.split(/[,\s\n]+/).filter(p => p.trim())
+  const parts = text.split(QUERY_SPLIT_RE).filter(p => p.trim())
   if (parts.length === 0) return false
   return parts.every(p =>
-    /^\d+$/.test(p.trim()) || /civitai\.com\/models\/\d+/.test(p.trim()),
+    NUMERIC_ID_RE.test(p.trim()) || CIVITAI_MODEL_URL_RE.test(p.trim()),
   )
 }
 
 /** Parse model IDs & version IDs from text (IDs + URLs) */
 function parseIds(text: string): Array<{ id: number; versionId?: number }> {
-  const parts = text.split(/[,\s\n]+/).filter(p => p.trim())
+  const parts = text.split(QUERY_SPLIT_RE).filter(p => p.trim())
   const seen = new Set<string>()
   const result: Array<{ id: number; versionId?: number }> = []
 
@@ -99,12 +120,11 @@ function parseIds(text: string): Array<{ id: number; versionId?: number }> {
     let id: number | undefined
     let versionId: number | undefined
 
-    const urlMatch = p.match(/civitai\.com\/models\/(\d+)/)
+    const urlMatch = p.match(CIVITAI_MODEL_URL_RE)
     if (urlMatch) {
       id = Number(urlMatch[1])
-      const vMatch = p.match(/[?&]modelVersionId=(\d+)/)
-      if (vMatch) versionId = Number(vMatch[1])
-    } else if (/^\d+$/.test(p)) {
+      if (urlMatch[2]) versionId = Number(urlMatch[2])
+    } else if (NUMERIC_ID_RE.test(p)) {
       id = Number(p)
     }
 
@@ -119,6 +139,73 @@ function parseIds(text: string): Array<{ id: number; versionId?: number }> {
   return result
 }
 
+/** Parse a Retry-After header (delta-seconds or HTTP date) into ms; null if absent/invalid */
+function retryAfterMs(res: Response): number | null {
+  const v = res.headers.get('Retry-After')
+  if (!v) return null
+  const secs = Number(v)
+  if (Number.isFinite(secs)) return Math.max(0, secs * 1000)
+  const at = Date.parse(v)
+  return Number.isNaN(at) ? null : Math.max(0, at - Date.now())
+}
+
+/**
+ * GET via the backend proxy. Throttled responses (429/503) are retried for this
+ * request only, waiting for Retry-After (or exponential backoff when absent).
+ * Successful responses don't sleep unless X-RateLimit-Remaining runs low.
+ */
+async function fetchWithRetry(url: string, signal: AbortSignal): Promise<Response> {
+  for (let attempt = 0; ; attempt++) {
+    const res = await fetch(url, { signal })
+    if ((res.status === 429 || res.status === 503) && attempt < LOOKUP_MAX_RETRIES) {
+      await sleep(Math.min(retryAfterMs(res) ?? 500 * 2 ** attempt, RETRY_AFTER_MAX_MS), signal)
+      continue
+    }
+    const remaining = Number(res.headers.get('X-RateLimit-Remaining') ?? NaN)
+    if (res.ok && remaining < RATE_LIMIT_LOW_WATER) {
+      // Nearly out of quota — pace to the advertised limit instead of running into 429s
+      const limit = Number(res.headers.get('X-RateLimit-Limit')) || 1
+      await sleep(1000 / limit, signal)
+    }
+    return res
+  }
+}
+
+// ── Model cache (module-level, shared across composable instances) ──
+
+const _modelCache = new Map<number, { at: number; data: any }>()
+
+/** Cached raw model, refreshed as most-recently-used; expired entries are dropped */
+function modelCacheGet(id: number): any | undefined {
+  const entry = _modelCache.get(id)
+  if (!entry) return undefined
+  _modelCache.delete(id)
+  if (Date.now() - entry.at > MODEL_CACHE_TTL_MS) return undefined
+  // Map keeps insertion order — re-inserting moves the entry to the MRU end
+  _modelCache.set(id, entry)
+  return entry.data
+}
+
+function modelCachePut(id: number, data: any) {
+  _modelCache.delete(id)
+  _modelCache.set(id, { at: Date.now(), data })
+  if (_modelCache.size > MODEL_CACHE_MAX) _modelCache.delete(_modelCache.keys().next().value!)
+}
+
+/** Fetch one model; failures resolve to null */
+async function fetchModelById(id: number, signal: AbortSignal): Promise<any | null> {
+  const res = await fetchWithRetry(`/api/civitai/model/${id}`, signal)
+  return res.ok ? res.json() : null
+}
+
+/** Fetch up to LOOKUP_BATCH_SIZE models in one request via the list endpoint (?ids=) */
+async function fetchModelsByIds(ids: number[], signal: AbortSignal): Promise<any[]> {
+  const res = await fetchWithRetry(`/api/civitai/models?ids=${ids.join(',')}`, signal)
+  if (!res.ok) return []
+  const data = await res.json()
+  return data?.items ?? []
+}
+
 /** Normalize a CivitAI v1 API model response to match CivitaiHit shape */
 function normalizeApiModel(m: any): CivitaiHit {
   const latestVersion = m.modelVersions?.[0]
@@ -157,6 +244,45 @@ function normalizeApiModel(m: any): CivitaiHit {
   }
 }
 
+/** Normalize an API model, selecting `versionId` (from a URL) when given */
+function toHit(data: any, versionId?: number): CivitaiHit {
+  const hit = normalizeApiModel(data)
+  if (versionId && data.modelVersions) {
+    const match = data.modelVersions.find((v: any) => v.id === versionId)
+    if (match) {
+      hit.version = {
+        id: match.id,
+        name: match.name,
+        baseModel: match.baseModel,
+        images: match.images?.map((img: any) => ({ url: img.url, type: img.type })),
+      }
+      hit.images = match.images?.map((img: any) => ({ url: img.url, type: img.type }))
+    }
+  }
+  return hit
+}
+
+// ── Image helpers (shared by cards / favorites) ───────
+
+const _previewCache = new WeakMap<CivitaiHit, CivitaiImage | null>()
+
+/** First preview image of a hit (model images, else its version's); memoized per hit object */
+export function hitPreviewImage(hit: CivitaiHit): CivitaiImage | null {
+  let img = _previewCache.get(hit)
+  if (img === undefined) {
+    img = (hit.images?.length ? hit.images[0] : hit.version?.images?.[0]) ?? null
+    _previewCache.set(hit, img)
+  }
+  return img
+}
+
+/** Resolve a CivitAI image id or absolute URL; `width` selects a resized CDN rendition */
+export function civitaiImageUrl(url: string | undefined, width?: number): string {
+  if (!url) return ''
+  if (url.startsWith('http')) return url
+  return `${CIVITAI_IMAGE_CDN}${url}${width ? `/width=${width}` : ''}/default.jpg`
+}
+
 // ── Composable ─────────────────────────────────────────
 
 export function useCivitaiSearch(sortKey: Ref<SortKey>) {
@@ -183,22 +309,26 @@ export function useCivitaiSearch(sortKey: Ref<SortKey>) {
   // Internal guards
   let _facetsPromise: Promise<void> | null = null
   let _searchId = 0
+  let _lookupCtrl: AbortController | null = null
   const initialSearchDone = ref(false)
 
   // Derived
   const hasMore = computed(() => (page.value + 1) * PAGE_SIZE < totalHits.value)
 
-  // ── Build Meilisearch filter array ──
-  function buildFilter(): string[] {
+  // ── Meilisearch filter array ──
+  // Rebuilt only when a facet selection changes; searches and loadMore reuse it
+  const typeFilter = computed(() =>
+    selectedTypes.value.map(t => `type = "${t}"`).join(' OR '),
+  )
+  const baseModelFilter = computed(() =>
+    selectedBaseModels.value.map(b => `version.baseModel = "${b}"`).join(' OR '),
+  )
+  const filter = computed(() => {
     const filters: string[] = []
-    if (selectedTypes.value.length > 0) {
-      filters.push(selectedTypes.value.map(t => `type = "${t}"`).join(' OR '))
-    }
-    if (selectedBaseModels.value.length > 0) {
-      filters.push(selectedBaseModels.value.map(b => `version.baseModel = "${b}"`).join(' OR '))
-    }
+    if (typeFilter.value) filters.push(typeFilter.value)
+    if (baseModelFilter.value) filters.push(baseModelFilter.value)
     return filters
-  }
+  })
 
   // ── Meilisearch text search ──
   async function searchMeili(query: string, pageNum: number, append: boolean) {
@@ -209,14 +339,14 @@ export function useCivitaiSearch(sortKey: Ref<SortKey>) {
       ? SORT_MAP['Most Downloaded']
       : sort
 
-    const filter = buildFilter()
+    const filters = filter.value
     const body = {
       queries: [{
         indexUid: 'models_v9',
         q: query,
         limit: PAGE_SIZE,
         offset: pageNum * PAGE_SIZE,
-        ...(filter.length > 0 ? { filter } : {}),
+        ...(filters.length > 0 ? { filter: filters } : {}),
         sort: effectiveSort,
         attributesToRetrieve: ATTRIBUTES_TO_RETRIEVE,
         attributesToHighlight: ['name'],
@@ -248,35 +378,57 @@ export function useCivitaiSearch(sortKey: Ref<SortKey>) {
   async function lookupByIds(text: string) {
     const mySearchId = _searchId
     const parsed = parseIds(text)
-    const results: CivitaiHit[] = []
+    // A newer search aborts lookups still in flight (see search())
+    const ctrl = new AbortController()
+    _lookupCtrl = ctrl
+
+    // Recently looked-up models come from the cache; the rest go to the network
+    const models = new Map<number, any>()
+    const ids: number[] = []
+    for (const id of new Set(parsed.map(p => p.id))) {
+      const cached = modelCacheGet(id)
+      if (cached) models.set(id, cached)
+      else ids.push(id)
+    }
 
-    for (const { id, versionId } of parsed) {
-      if (_searchId !== mySearchId) return
+    // One list-endpoint request per LOOKUP_BATCH_SIZE IDs, chunks in parallel
+    const chunks: number[][] = []
+    for (let i = 0; i < ids.length; i += LOOKUP_BATCH_SIZE) {
+      chunks.push(ids.slice(i, i + LOOKUP_BATCH_SIZE))
+    }
+    await mapLimit(chunks, LOOKUP_CONCURRENCY, async (chunk) => {
+      if (ctrl.signal.aborted) return
       try {
-        const res = await fetch(`/api/civitai/model/${id}`)
-        if (res.ok) {
-          const data = await res.json()
-          const hit = normalizeApiModel(data)
-          // If URL specified a versionId, select that version
-          if (versionId && data.modelVersions) {
-            const match = data.modelVersions.find((v: any) => v.id === versionId)
-            if (match) {
-              hit.version = {
-                id: match.id,
-                name: match.name,
-                baseModel: match.baseModel,
-                images: match.images?.map((img: any) => ({ url: img.url, type: img.type })),
-              }
-              hit.images = match.images?.map((img: any) => ({ url: img.url, type: img.type }))
-            }
-          }
-          cache.set(hit.id, hit)
-          results.push(hit)
+        for (const m of await fetchModelsByIds(chunk, ctrl.signal)) {
+          models.set(m.id, m)
+          modelCachePut(m.id, m)
         }
       } catch (e) {
-        console.error(`CivitAI lookup failed for ID ${id}:`, e)
+        if (!ctrl.signal.aborted) console.error(`CivitAI batch lookup failed for IDs ${chunk.join(',')}:`, e)
       }
-    }
+    })
+
+    // The list endpoint can omit some models (hidden / filtered) — retry those one by one
+    const missing = ids.filter(id => !models.has(id))
+    await mapLimit(missing, LOOKUP_CONCURRENCY, async (id) => {
+      if (ctrl.signal.aborted) return
+      try {
+        const data = await fetchModelById(id, ctrl.signal)
+        if (data) {
+          models.set(id, data)
+          modelCachePut(id, data)
+        }
+      } catch (e) {
+        if (!ctrl.signal.aborted) console.error(`CivitAI lookup failed for ID ${id}:`, e)
+      }
+    })
+    if (_lookupCtrl === ctrl) _lookupCtrl = null
+    if (_searchId !== mySearchId) return
+
+    const results = parsed
+      .filter(({ id }) => models.has(id))
+      .map(({ id, versionId }) => toHit(models.get(id), versionId))
+    for (const h of results) cache.set(h.id, h)
 
     hits.value = results
     totalHits.value = results.length
@@ -286,6 +438,7 @@ export function useCivitaiSearch(sortKey: Ref<SortKey>) {
   async function search(query: string) {
     const q = query.trim()
     ++_searchId
+    _lookupCtrl?.abort()
     loading.value = true
     errorMsg.value = ''
     page.value = 0
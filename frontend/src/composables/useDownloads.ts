@@ -80,6 +80,7 @@ export function useDownloads() {
     // Selectors (primary API for UI state)
     getVersionState: store.getVersionState,
     getVersionDownloadInfo: store.getVersionDownloadInfo,
+    getVersionTask: store.getVersionTask,
     getModelAggregateState: store.getModelAggregateState,
 
     // Actions
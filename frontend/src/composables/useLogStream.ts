@@ -124,7 +124,7 @@ export function useLogStream(opts: LogStreamOptions) {
     return []
   }
 
-  function parseStreamMessage(data: string): RawLogEntry | null {
+  function parseStreamMessage(data: string): RawLogEntry | RawLogEntry[] | null {
     if (opts.parseMessage) {
       return opts.parseMessage(data)
     }
@@ -132,6 +132,8 @@ export function useLogStream(opts: LogStreamOptions) {
     try {
       const parsed = JSON.parse(data)
       if (parsed && typeof parsed === 'object') {
+        // Server-side coalesced burst: { batch: [{ line, level }, ...] }
+        if (Array.isArray(parsed.batch)) return parsed.batch
         if (typeof parsed.line === 'string') {
           return {
             line: parsed.line,
@@ -191,7 +193,9 @@ export function useLogStream(opts: LogStreamOptions) {
     }
     source.onmessage = (e) => {
       if (gen !== generation) return
-      addLine(parseStreamMessage(e.data))
+      const entry = parseStreamMessage(e.data)
+      if (Array.isArray(entry)) entry.forEach(addLine)
+      else addLine(entry)
     }
     source.onerror = () => {
       if (gen !== generation) return
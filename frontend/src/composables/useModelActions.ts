@@ -4,6 +4,10 @@ import { useApiFetch } from './useApiFetch'
 import { useConfirm } from './useConfirm'
 import { useToast } from './useToast'
 import type { LocalModel } from './useLocalModels'
+import { mapLimit } from '@/utils/async'
+
+/** Max parallel fetch_info calls in fetchAll (bounded: each one hashes a model file) */
+const FETCH_ALL_CONCURRENCY = 4
 
 export interface BatchProgress {
   running: boolean
@@ -89,15 +93,15 @@ export function useModelActions(
 
     batchProgress.running = true
     batchProgress.total = noInfo.length
+    batchProgress.current = 0
     let successCount = 0
     let failCount = 0
 
     try {
-      for (let i = 0; i < noInfo.length; i++) {
-        const m = noInfo[i]
-        batchProgress.current = i + 1
+      // Each fetch_info is SHA256 + CivitAI by-hash lookup on the backend —
+      // run a few in parallel instead of strictly one after another
+      await mapLimit(noInfo, FETCH_ALL_CONCURRENCY, async (m) => {
         batchProgress.filename = m.filename
-
         try {
           const result = await post('/api/local_models/fetch_info', { abs_path: m.abs_path })
           if (result) successCount++
@@ -105,8 +109,10 @@ export function useModelActions(
         } catch (e) {
           failCount++
           console.error(m.filename, e)
+        } finally {
+          batchProgress.current++
         }
-      }
+      })
     } finally {
       batchProgress.running = false
     }
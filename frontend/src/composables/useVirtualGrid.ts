@@ -0,0 +1,117 @@
+import { ref, computed, watch, onMounted, onBeforeUnmount, nextTick, type Ref, type CSSProperties } from 'vue'
+
+export interface VirtualGridOptions {
+  /** Render everything until the list grows past this many items */
+  threshold?: number
+  /** Extra rows kept rendered above and below the viewport */
+  overscanRows?: number
+}
+
+/**
+ * Windowed rendering for a CSS grid of equal-height cards (a flex column
+ * counts as a one-column grid, so plain lists work too).
+ *
+ * Only the rows around the viewport are rendered; rows above/below are replaced
+ * by container padding so total scroll height (and anything after the grid, such
+ * as an infinite-scroll sentinel) stays where it was. Column count and row height
+ * are read from the live grid, so responsive `auto-fill` layouts keep working.
+ * Scroll is observed in the capture phase, so any scrolling ancestor works.
+ */
+export function useVirtualGrid<T>(
+  gridRef: Ref<HTMLElement | null>,
+  items: Ref<T[]>,
+  opts: VirtualGridOptions = {},
+) {
+  const threshold = opts.threshold ?? 60
+  const overscan = opts.overscanRows ?? 2
+
+  const cols = ref(1)
+  /** Card height + row gap, in px (0 until measured) */
+  const rowHeight = ref(0)
+  const startRow = ref(0)
+  const endRow = ref(0)
+
+  const enabled = computed(() => items.value.length > threshold && rowHeight.value > 0)
+  const totalRows = computed(() => Math.ceil(items.value.length / cols.value))
+
+  const visibleItems = computed(() => {
+    if (!enabled.value) return items.value
+    return items.value.slice(startRow.value * cols.value, endRow.value * cols.value)
+  })
+
+  const gridStyle = computed<CSSProperties | undefined>(() => {
+    if (!enabled.value) return undefined
+    return {
+      paddingTop: `${startRow.value * rowHeight.value}px`,
+      paddingBottom: `${Math.max(0, totalRows.value - endRow.value) * rowHeight.value}px`,
+    }
+  })
+
+  function updateWindow() {
+    const el = gridRef.value
+    if (!el || !rowHeight.value) return
+    // Row r starts at top + r * rowHeight (padding stands in for skipped rows)
+    const top = el.getBoundingClientRect().top
+    const first = Math.floor(-top / rowHeight.value) - overscan
+    const last = Math.ceil((window.innerHeight - top) / rowHeight.value) + overscan
+    const start = Math.min(Math.max(0, first), Math.max(0, totalRows.value - 1))
+    const end = Math.min(totalRows.value, Math.max(start + 1, last))
+    if (start !== startRow.value) startRow.value = start
+    if (end !== endRow.value) endRow.value = end
+  }
+
+  function measure() {
+    const el = gridRef.value
+    if (!el) return
+    const style = getComputedStyle(el)
+    // Resolved value lists one length per track, e.g. "320px 320px 320px" ("none" → 1)
+    cols.value = Math.max(1, style.gridTemplateColumns.split(' ').filter(Boolean).length)
+    const card = el.firstElementChild as HTMLElement | null
+    if (card?.offsetHeight) rowHeight.value = card.offsetHeight + (parseFloat(style.rowGap) || 0)
+    updateWindow()
+  }
+
+  // Scroll fires many times per frame — recompute at most once per frame
+  let raf = 0
+  function onScroll() {
+    if (raf) return
+    raf = requestAnimationFrame(() => {
+      raf = 0
+      updateWindow()
+    })
+  }
+
+  let ro: ResizeObserver | null = null
+  let lastWidth = -1
+
+  onMounted(() => {
+    window.addEventListener('scroll', onScroll, { capture: true, passive: true })
+    window.addEventListener('resize', onScroll)
+  })
+
+  watch(gridRef, (el) => {
+    ro?.disconnect()
+    ro = null
+    if (!el) return
+    nextTick(measure)
+    // Column count / card height only change with width
+    ro = new ResizeObserver(([entry]) => {
+      const w = entry.contentRect.width
+      if (w === lastWidth) return
+      lastWidth = w
+      measure()
+    })
+    ro.observe(el)
+  }, { immediate: true })
+
+  watch(() => items.value.length, () => nextTick(measure), { flush: 'post' })
+
+  onBeforeUnmount(() => {
+    if (raf) cancelAnimationFrame(raf)
+    ro?.disconnect()
+    window.removeEventListener('scroll', onScroll, { capture: true } as EventListenerOptions)
+    window.removeEventListener('resize', onScroll)
+  })
+
+  return { visibleItems, gridStyle, enabled }
+}
@@ -56,6 +56,8 @@ export type ModelAggregateState = 'idle' | 'downloading' | 'partial' | 'installe
 // ── Constants ──────────────────────────────────────────
 
 const POLL_INTERVAL = 3000
+/** Max items per /api/downloads/civitai/batch request */
+const BATCH_SUBMIT_SIZE = 20
 const IDLE_DISCONNECT_MS = 60_000
 const ACTIVE_STATES = new Set<string>(['active', 'queued', 'paused'])
 const TERMINAL_STATES = new Set<string>(['complete', 'failed', 'cancelled'])
@@ -177,14 +179,14 @@ export const useDownloadsStore = defineStore('downloads', () => {
     } catch { /* ignore */ }
   }
 
+  // Favorite mutations touch only the affected entries of the reactive Map and roll back
+  // with the inverse operation, instead of copying the whole map as a snapshot per toggle.
+
   async function addFavorite(item: CartItem): Promise<boolean> {
     const key = cartKey(item.modelId, item.versionId)
     if (favorites.value.has(key)) return false
     // optimistic insert
-    const prev = new Map(favorites.value)
-    const optimistic = new Map(prev)
-    optimistic.set(key, item)
-    favorites.value = optimistic
+    favorites.value.set(key, item)
     try {
       const res = await fetch('/api/favorites', {
         method: 'POST',
@@ -194,61 +196,57 @@ export const useDownloadsStore = defineStore('downloads', () => {
       if (!res.ok) {
         const d = await res.json().catch(() => ({}))
         toast(d?.error || `HTTP ${res.status}`, 'error')
-        favorites.value = prev
+        favorites.value.delete(key)
         return false
       }
       return true
     } catch (e: unknown) {
       toast((e as Error)?.message || 'Network error', 'error')
-      favorites.value = prev
+      favorites.value.delete(key)
       return false
     }
   }
 
   async function removeFavorite(key: string): Promise<void> {
-    if (!favorites.value.has(key)) return
-    const prev = new Map(favorites.value)
-    const m = new Map(prev)
-    m.delete(key)
-    favorites.value = m
+    const item = favorites.value.get(key)
+    if (!item) return
+    favorites.value.delete(key)
     try {
       const res = await fetch(`/api/favorites/${encodeURIComponent(key)}`, { method: 'DELETE' })
       if (!res.ok && res.status !== 404) {
         const d = await res.json().catch(() => ({}))
         toast(d?.error || `HTTP ${res.status}`, 'error')
-        favorites.value = prev
+        favorites.value.set(key, item)
       }
     } catch (e: unknown) {
       toast((e as Error)?.message || 'Network error', 'error')
-      favorites.value = prev
+      favorites.value.set(key, item)
     }
   }
 
   async function removeFavoritesByModel(modelId: string): Promise<void> {
-    const keys: string[] = []
+    const removed: Array<[string, CartItem]> = []
     for (const [k, item] of favorites.value) {
-      if (item.modelId === String(modelId) || k === String(modelId) || k.startsWith(`${String(modelId)}:`)) keys.push(k)
+      if (item.modelId === String(modelId) || k === String(modelId) || k.startsWith(`${String(modelId)}:`)) removed.push([k, item])
     }
-    if (!keys.length) return
-    const prev = new Map(favorites.value)
-    const m = new Map(prev)
-    for (const k of keys) m.delete(k)
-    favorites.value = m
+    if (!removed.length) return
+    for (const [k] of removed) favorites.value.delete(k)
+    const rollback = () => { for (const [k, item] of removed) favorites.value.set(k, item) }
     try {
       const res = await fetch(`/api/favorites?model_id=${encodeURIComponent(String(modelId))}`, { method: 'DELETE' })
       if (!res.ok) {
         const d = await res.json().catch(() => ({}))
         toast(d?.error || `HTTP ${res.status}`, 'error')
-        favorites.value = prev
+        rollback()
       }
     } catch (e: unknown) {
       toast((e as Error)?.message || 'Network error', 'error')
-      favorites.value = prev
+      rollback()
     }
   }
 
   async function clearFavorites(): Promise<void> {
-    const prev = new Map(favorites.value)
+    const prev = favorites.value
     favorites.value = new Map()
     try {
       const res = await fetch('/api/favorites', { method: 'DELETE' })
@@ -263,12 +261,15 @@ export const useDownloadsStore = defineStore('downloads', () => {
     }
   }
 
+  /** Model ids with at least one favorite entry (keys are `modelId` or `modelId:versionId`) */
+  const favoriteModelIds = computed(() => {
+    const ids = new Set<string>()
+    for (const k of favorites.value.keys()) ids.add(k.split(':')[0])
+    return ids
+  })
+
   function isInFavorites(modelId: string | number): boolean {
-    const id = String(modelId)
-    for (const [k] of favorites.value) {
-      if (k === id || k.startsWith(`${id}:`)) return true
-    }
-    return false
+    return favoriteModelIds.value.has(String(modelId))
   }
 
   async function updateFavoriteVersion(key: string, versionId: number, versionName: string, baseModel?: string): Promise<void> {
@@ -276,11 +277,12 @@ export const useDownloadsStore = defineStore('downloads', () => {
     if (!item) return
     const updated: CartItem = { ...item, versionId, versionName, baseModel: baseModel || item.baseModel }
     const newKey = cartKey(item.modelId, versionId)
-    const prev = new Map(favorites.value)
-    const m = new Map(prev)
-    m.delete(key)
-    m.set(newKey, updated)
-    favorites.value = m
+    favorites.value.delete(key)
+    favorites.value.set(newKey, updated)
+    const rollback = () => {
+      favorites.value.delete(newKey)
+      favorites.value.set(key, item)
+    }
     // optimistic remove old + add new via API
     try { await fetch(`/api/favorites/${encodeURIComponent(key)}`, { method: 'DELETE' }) } catch { /* ignore */ }
     try {
@@ -292,11 +294,11 @@ export const useDownloadsStore = defineStore('downloads', () => {
       if (!res.ok) {
         const d = await res.json().catch(() => ({}))
         toast(d?.error || `HTTP ${res.status}`, 'error')
-        favorites.value = prev
+        rollback()
       }
     } catch (e: unknown) {
       toast((e as Error)?.message || 'Network error', 'error')
-      favorites.value = prev
+      rollback()
     }
   }
 
@@ -626,26 +628,63 @@ export const useDownloadsStore = defineStore('downloads', () => {
     _batchInFlight++
     startPolling()
 
+    const payloads = items.map(item => ({
+      model_id: item.modelId,
+      model_type: (item.type || 'Checkpoint').toLowerCase(),
+      ...(item.versionId && { version_id: item.versionId }),
+    }))
+    const vidOf = (item: CartItem) => item.versionId ? String(item.versionId) : item.modelId
+
     let ok = 0, fail = 0
-    for (const item of items) {
-      const vid = item.versionId ? String(item.versionId) : item.modelId
-      try {
-        const res = await fetch('/api/downloads/civitai', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({
-            model_id: item.modelId,
-            model_type: (item.type || 'Checkpoint').toLowerCase(),
-            ...(item.versionId && { version_id: item.versionId }),
-          }),
-        })
-        const data = await res.json()
-        clearSubmitting(vid)
-        if (res.ok && !data.error) ok++
-        else fail++
-      } catch {
-        clearSubmitting(vid)
-        fail++
+    let batchSupported = true
+    for (let start = 0; start < items.length; start += BATCH_SUBMIT_SIZE) {
+      const chunk = items.slice(start, start + BATCH_SUBMIT_SIZE)
+      const chunkPayloads = payloads.slice(start, start + BATCH_SUBMIT_SIZE)
+
+      // One POST per chunk; fall back to per-item submits if the endpoint is missing
+      if (batchSupported) {
+        try {
+          const res = await fetch('/api/downloads/civitai/batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ items: chunkPayloads }),
+          })
+          if (res.status === 404) {
+            batchSupported = false
+          } else {
+            const data = res.ok ? await res.json() : null
+            const results: Array<{ error?: string; http_status?: number }> = data?.results ?? []
+            chunk.forEach((item, i) => {
+              clearSubmitting(vidOf(item))
+              const r = results[i]
+              if (r && !r.error && (r.http_status ?? 200) < 400) ok++
+              else fail++
+            })
+            continue
+          }
+        } catch {
+          chunk.forEach(item => clearSubmitting(vidOf(item)))
+          fail += chunk.length
+          continue
+        }
+      }
+
+      for (let i = 0; i < chunk.length; i++) {
+        const vid = vidOf(chunk[i])
+        try {
+          const res = await fetch('/api/downloads/civitai', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(chunkPayloads[i]),
+          })
+          const data = await res.json()
+          clearSubmitting(vid)
+          if (res.ok && !data.error) ok++
+          else fail++
+        } catch {
+          clearSubmitting(vid)
+          fail++
+        }
       }
     }
 
@@ -728,6 +767,41 @@ export const useDownloadsStore = defineStore('downloads', () => {
 
   // ── Selectors (pure functions reading state) ──
 
+  /**
+   * Task positions keyed by version id, and by model id for version-less tasks.
+   * Cards call the selectors below once per render; the index keeps each call
+   * O(matches) instead of a scan over every task.
+   */
+  const taskIndex = computed(() => {
+    const byVid = new Map<string, number[]>()
+    const byMid = new Map<string, number[]>()
+    tasks.value.forEach((task, i) => {
+      const taskVid = task.meta?.version_id ? String(task.meta.version_id) : null
+      const taskMid = task.meta?.model_id ? String(task.meta.model_id) : null
+      const map = taskVid ? byVid : byMid
+      const key = taskVid ?? taskMid
+      if (!key) return
+      const list = map.get(key)
+      if (list) list.push(i)
+      else map.set(key, [i])
+    })
+    return { byVid, byMid }
+  })
+
+  /** Tasks matching a version (or its model, for version-less tasks), in task order */
+  function tasksForVersion(mid: string, vid: string): DownloadTask[] {
+    const { byVid, byMid } = taskIndex.value
+    const a = byVid.get(vid)
+    const b = byMid.get(mid)
+    const idx = a && b ? [...a, ...b].sort((x, y) => x - y) : (a ?? b ?? [])
+    return idx.map(i => tasks.value[i])
+  }
+
+  /** First task matching a version (or its model, for version-less tasks) */
+  function getVersionTask(modelId: string | number, versionId: string | number): DownloadTask | undefined {
+    return tasksForVersion(String(modelId), String(versionId))[0]
+  }
+
   /**
    * Get the unified state for a specific version.
    * Priority: submitting > resourceStates > active task > local index > idle
@@ -745,15 +819,11 @@ export const useDownloadsStore = defineStore('downloads', () => {
       if (mapped !== 'idle') return mapped
     }
 
-    for (const task of tasks.value) {
-      const taskVid = task.meta?.version_id ? String(task.meta.version_id) : null
-      const taskMid = task.meta?.model_id ? String(task.meta.model_id) : null
-      if (taskVid === vid || (!taskVid && taskMid === mid)) {
-        if (task.status === 'active' || task.status === 'queued') return 'downloading'
-        if (task.status === 'paused') return 'paused'
-        if (task.status === 'failed') return 'failed'
-        if (task.status === 'complete') return 'installed'
-      }
+    for (const task of tasksForVersion(mid, vid)) {
+      if (task.status === 'active' || task.status === 'queued') return 'downloading'
+      if (task.status === 'paused') return 'paused'
+      if (task.status === 'failed') return 'failed'
+      if (task.status === 'complete') return 'installed'
     }
 
     const localVersions = localCivitaiIds.value.get(mid)
@@ -792,11 +862,7 @@ export const useDownloadsStore = defineStore('downloads', () => {
     const vid = String(versionId)
     const state = getVersionState(mid, vid)
 
-    const task = tasks.value.find(t => {
-      const taskVid = t.meta?.version_id ? String(t.meta.version_id) : null
-      const taskMid = t.meta?.model_id ? String(t.meta.model_id) : null
-      return taskVid === vid || (!taskVid && taskMid === mid)
-    })
+    const task = getVersionTask(mid, vid)
 
     if (task && (task.status === 'active' || task.status === 'queued' || task.status === 'paused')) {
       return {
@@ -894,6 +960,7 @@ export const useDownloadsStore = defineStore('downloads', () => {
     // Selectors
     getVersionState,
     getVersionDownloadInfo,
+    getVersionTask,
     getModelAggregateState,
 
     // Actions
@@ -243,20 +243,50 @@ export const useGenerateStore = defineStore('generate', () => {
   let saveTimer: ReturnType<typeof setTimeout> | null = null
   let autoSaveEnabled = false
 
+  // Per-model-type JSON shards: only types edited since the last save are re-stringified
+  const stateJson = new Map<string, string>()
+  const trackedTypes = new Set<string>()
+  const dirtyTypes = new Set<string>()
+
+  function trackType(type: string) {
+    if (trackedTypes.has(type)) return
+    trackedTypes.add(type)
+    dirtyTypes.add(type)
+    watch(() => modelStates[type], () => {
+      dirtyTypes.add(type)
+      scheduleSave()
+    }, { deep: true })
+  }
+
   function scheduleSave() {
     if (!autoSaveEnabled) return
     if (saveTimer) clearTimeout(saveTimer)
     saveTimer = setTimeout(save, SAVE_DEBOUNCE_MS)
   }
 
+  /** Write a pending debounced save now (page being hidden / unloaded) */
+  function flushSave() {
+    if (!saveTimer) return
+    clearTimeout(saveTimer)
+    saveTimer = null
+    save()
+  }
+
   function enableAutoSave() {
+    if (autoSaveEnabled) return
     autoSaveEnabled = true
-    // Watch modelStates deeply for any change
-    watch(
-      () => JSON.stringify(modelStates),
-      () => scheduleSave(),
-    )
+    // Deep watch per model type: change tracking only, and it tells save() which shard is stale.
+    // Watching JSON.stringify(modelStates) re-serialized everything on every keystroke.
+    watch(() => Object.keys(modelStates), (types) => {
+      types.forEach(trackType)
+      scheduleSave()
+    }, { immediate: true })
     watch(activeModelType, () => scheduleSave())
+    // The debounce must not drop the last edit when the tab goes away
+    window.addEventListener('pagehide', flushSave)
+    document.addEventListener('visibilitychange', () => {
+      if (document.visibilityState === 'hidden') flushSave()
+    })
   }
 
   // ── Actions ──────────────────────────────────────────────────────────────
@@ -270,13 +300,24 @@ export const useGenerateStore = defineStore('generate', () => {
   }
 
   function save() {
+    if (saveTimer) {
+      clearTimeout(saveTimer)
+      saveTimer = null
+    }
     try {
-      const data = {
-        _version: SCHEMA_VERSION,
-        activeModelType: activeModelType.value,
-        modelStates: JSON.parse(JSON.stringify(modelStates)),
-      }
-      localStorage.setItem(STORAGE_KEY, JSON.stringify(data))
+      // Same document shape as JSON.stringify({ _version, activeModelType, modelStates }),
+      // assembled from cached per-type shards; untracked types are always re-serialized
+      const states = Object.keys(modelStates).map((type) => {
+        let json = stateJson.get(type)
+        if (json === undefined || dirtyTypes.has(type) || !trackedTypes.has(type)) {
+          json = JSON.stringify(modelStates[type])
+          stateJson.set(type, json)
+        }
+        return `${JSON.stringify(type)}:${json}`
+      })
+      dirtyTypes.clear()
+      const head = JSON.stringify({ _version: SCHEMA_VERSION, activeModelType: activeModelType.value })
+      localStorage.setItem(STORAGE_KEY, `${head.slice(0, -1)},"modelStates":{${states.join(',')}}}`)
     } catch { /* ignore quota errors */ }
   }
 
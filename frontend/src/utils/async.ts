@@ -0,0 +1,42 @@
+/** Async helpers — pure functions, no framework dependency */
+
+/**
+ * Map `items` through an async `fn` with at most `limit` calls in flight.
+ * Results keep input order (like Promise.all); a rejected call rejects the whole batch,
+ * so callers that want per-item tolerance should catch inside `fn`.
+ */
+export async function mapLimit<T, R>(
+  items: readonly T[],
+  limit: number,
+  fn: (item: T, index: number) => Promise<R>,
+): Promise<R[]> {
+  const results = new Array<R>(items.length)
+  let next = 0
+
+  async function worker() {
+    while (next < items.length) {
+      const i = next++
+      results[i] = await fn(items[i], i)
+    }
+  }
+
+  const workers = Array.from({ length: Math.min(Math.max(limit, 1), items.length) }, worker)
+  await Promise.all(workers)
+  return results
+}
+
+/** Resolve after `ms`, or reject with the signal's reason if it aborts first. */
+export function sleep(ms: number, signal?: AbortSignal): Promise<void> {
+  return new Promise((resolve, reject) => {
+    if (signal?.aborted) return reject(signal.reason)
+    const timer = setTimeout(() => {
+      signal?.removeEventListener('abort', onAbort)
+      resolve()
+    }, ms)
+    function onAbort() {
+      clearTimeout(timer)
+      reject(signal!.reason)
+    }
+    signal?.addEventListener('abort', onAbort, { once: true })
+  })
+}
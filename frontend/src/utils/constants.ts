@@ -1,5 +1,18 @@
 export const CIVITAI_API_BASE = 'https://civitai.com/api/v1'
 
+/** CivitAI image CDN prefix for relative image ids (`${CIVITAI_IMAGE_CDN}${id}/width=450/default.jpg`) */
+export const CIVITAI_IMAGE_CDN = 'https://image.civitai.com/xG1nkqKTMzGDvpLrqFT7WA/'
+
+/** CivitAI model type (lowercased) → local model category key (MODEL_CATEGORY_COLORS) */
+export const CIVITAI_TYPE_CATEGORY: Record<string, string> = {
+  checkpoint: 'checkpoints',
+  lora: 'loras',
+  textualinversion: 'embeddings',
+  controlnet: 'controlnet',
+  vae: 'vae',
+  upscaler: 'upscale_models',
+}
+
 /** Model category → badge color mapping (used by Badge component across pages) */
 export const MODEL_CATEGORY_COLORS: Record<string, string> = {
   checkpoints: '#f472b6',
@@ -1,5 +1,23 @@
 /** Formatting utilities — pure functions, no framework dependency */
 
+// toLocaleString() builds a fresh Intl.NumberFormat per call; share one and memoize,
+// since grids re-format the same counts on every render.
+const _countFmt = new Intl.NumberFormat()
+const _countCache = new Map<number, string>()
+const COUNT_CACHE_MAX = 2000
+
+/** Locale-grouped integer (download / like counts) */
+export function fmtCount(n: number | null | undefined): string {
+  const v = n || 0
+  let s = _countCache.get(v)
+  if (s === undefined) {
+    s = _countFmt.format(v)
+    if (_countCache.size >= COUNT_CACHE_MAX) _countCache.clear()
+    _countCache.set(v, s)
+  }
+  return s
+}
+
 export function fmtBytes(b: number): string {
   if (!b && b !== 0) return '—'
   if (b < 1024) return b + ' B'